@@ -0,0 +1,418 @@
+"""
+Benchmark suite of the puzzle solvers and the tic tac toe engines.
+Workloads:
+    puzzle8    Seeded 8-puzzle instances binned by optimal depth, solved by every solver/heuristic pair
+    korf100    The 100 15-puzzle instances of Korf (1985) with their optimal solution lengths, read from
+               korf100.txt next to this script. Another set can be given with --korf-file, one instance per line:
+               16 tiles in row-major order with 0 as the blank, optionally preceded by an instance number and
+               followed by the optimal solution length.
+               The goal is the blank in the top left corner followed by the tiles 1 .. 15
+    tictactoe  Seeded non-terminal tic tac toe positions with the computer to move, searched by every engine.
+               tic_tac_toe/solution_table.npy is built first if it is missing, so the 'table' engine measures
+               table lookups rather than its minimax fallback
+Every (workload, configuration) pair runs in a fresh process and records wall time, nodes expanded, peak RSS and
+the fraction of optimal answers. Results are written as JSON and can be compared with an earlier result file:
+    python run_benchmarks.py --output results.json
+    python run_benchmarks.py --baseline results.json --time-threshold 1.2
+The exit code is 1 if a metric regressed beyond its threshold.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'n_puzzle'))
+sys.path.insert(0, os.path.join(ROOT, 'tic_tac_toe'))
+
+import numpy as np
+
+from distance_oracle import oracle_search_for_puzzle_problem
+from external_search import external_search_for_puzzle_problem
+from move_table import move_blank, target_table
+from puzzle_state import PuzzleState, astar_search_for_puzzle_problem, ida_star_search_for_puzzle_problem, \
+    generate_solvable_state, run_moves
+from search_stats import SearchStats
+
+from batch_search import batch_minimax_search
+from solution_table import MOVES_MASK, build_solution_table, load_solution_table, player_index, \
+    save_solution_table, winner
+from tic_tac_toe import MinimaxSearch
+from transposition_table import TranspositionTable, board_code
+
+
+WORKLOADS = ('puzzle8', 'korf100', 'tictactoe')
+
+# Korf's 100 15-puzzle instances with their optimal solution lengths
+KORF_FILE = os.path.join(ROOT, 'benchmarks', 'korf100.txt')
+
+PUZZLE_SOLVERS = {
+    'astar': astar_search_for_puzzle_problem,
+    'ida_star': ida_star_search_for_puzzle_problem,
+    'external': external_search_for_puzzle_problem,
+    'oracle': oracle_search_for_puzzle_problem,
+}
+
+# Optimal depth bins of the 8-puzzle workload, inclusive
+DEPTH_BINS = ((0, 9), (10, 14), (15, 19), (20, 24), (25, 31))
+
+TICTACTOE_ENGINES = ('minimax', 'alphabeta', 'negamax', 'table', 'bitboard', 'batch')
+
+# Metrics compared with the baseline: name -> True if larger is worse
+COMPARED_METRICS = {
+    'wall_time': True,
+    'nodes_expanded': True,
+    'peak_rss_kb': True,
+    'solved': False,
+    'optimal_fraction': False,
+}
+
+
+def peak_rss_kb():
+    """
+    Peak resident set size of this process in KB
+    """
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def random_walk(dst_state, length, rng):
+    """
+    State reached by a random walk from 'dst_state' without immediate move reversals
+    """
+    tiles = dst_state.state.ravel().tolist()
+    blank = tiles.index(-1)
+    targets = target_table(dst_state.square_size)
+    previous = None
+    for _ in range(length):
+        moves = [move for move in range(4) if targets[blank][move] != -1 and move != previous]
+        move = rng.choice(moves)
+        blank = move_blank(tiles, blank, move, targets)
+        previous = move ^ 1
+    state = PuzzleState(square_size=dst_state.square_size)
+    state.state = np.asarray(tiles).reshape(dst_state.square_size, dst_state.square_size)
+    return state
+
+
+def puzzle8_instances(per_bin, seed):
+    """
+    Seeded 8-puzzle instances, 'per_bin' per optimal depth bin. Half of the candidates are random walks from the
+    goal (to fill the shallow bins), the other half are uniformly shuffled boards
+    :return: dict bin name -> list of (init tiles, optimal depth), the goal is the normal state
+    """
+    dst_state = PuzzleState(square_size=3)
+    bins = {'d{:02d}-{:02d}'.format(low, high): [] for low, high in DEPTH_BINS}
+    rng = random.Random(seed)
+    for candidate in range(200 * per_bin * len(DEPTH_BINS)):
+        if all(len(instances) >= per_bin for instances in bins.values()):
+            break
+        if candidate % 2 == 0:
+            init_state = random_walk(dst_state, rng.randint(1, 40), rng)
+        else:
+            init_state = generate_solvable_state(3, dst_state, seed=rng.randrange(1 << 30))
+        depth = len(astar_search_for_puzzle_problem(init_state, dst_state, heuristics='linear_conflict'))
+        for low, high in DEPTH_BINS:
+            name = 'd{:02d}-{:02d}'.format(low, high)
+            if low <= depth <= high and len(bins[name]) < per_bin:
+                bins[name].append((init_state.state.ravel().tolist(), depth))
+    return bins
+
+
+def load_korf_instances(path, count):
+    """
+    Read Korf's 15-puzzle instances
+    :param path: instance file, see the module docstring
+    :param count: maximum number of instances
+    :return: list of (init tiles with -1 as the blank, optimal depth or None)
+    """
+    instances = []
+    with open(path) as f:
+        for line in f:
+            values = [int(value) for value in line.split('#')[0].split()]
+            if not values:
+                continue
+            if len(values) == 16:
+                tiles, depth = values, None
+            elif len(values) == 17:
+                # instance number and tiles, or tiles and optimal length
+                if sorted(values[1:]) == list(range(16)):
+                    tiles, depth = values[1:], None
+                else:
+                    tiles, depth = values[:16], values[16]
+            elif len(values) == 18:
+                tiles, depth = values[1:17], values[17]
+            else:
+                raise ValueError('Invalid instance line: {}'.format(line.strip()))
+            if sorted(tiles) != list(range(16)):
+                raise ValueError('Invalid instance tiles: {}'.format(line.strip()))
+            instances.append(([-1 if tile == 0 else tile for tile in tiles], depth))
+            if len(instances) >= count:
+                break
+    return instances
+
+
+def run_puzzle_job(workload, config, instances, square_size, time_limit, max_nodes):
+    """
+    Solve a list of instances with one solver/heuristic pair, in a worker process
+    :param instances: list of (init tiles, optimal depth or None)
+    :return: result dict
+    """
+    solver_name, heuristics = config.split('/')
+    if heuristics == 'none':
+        # Plain breadth-first search of the external solver
+        heuristics = None
+    solver = PUZZLE_SOLVERS[solver_name]
+    dst_state = PuzzleState(square_size=square_size)
+
+    wall_time, nodes, solved, optimal, known = 0.0, 0, 0, 0, 0
+    for tiles, depth in instances:
+        init_state = PuzzleState(square_size=square_size)
+        init_state.state = np.asarray(tiles).reshape(square_size, square_size)
+        stats = SearchStats()
+        start = time.perf_counter()
+        moves = solver(init_state, dst_state, heuristics=heuristics, stats=stats, time_limit=time_limit,
+                       max_nodes=max_nodes)
+        wall_time += time.perf_counter() - start
+        nodes += stats.nodes_expanded
+        if moves is not None and run_moves(init_state, dst_state, moves):
+            solved += 1
+            if depth is not None:
+                optimal += len(moves) == depth
+        if depth is not None:
+            known += 1
+
+    return {
+        'workload': workload,
+        'config': config,
+        'instances': len(instances),
+        'solved': solved,
+        'wall_time': wall_time,
+        'mean_time': wall_time / len(instances) if instances else None,
+        'nodes_expanded': nodes,
+        'peak_rss_kb': peak_rss_kb(),
+        'optimal_fraction': optimal / known if known else None,
+    }
+
+
+def tictactoe_positions(count, seed):
+    """
+    Seeded positions of games where you(-1) move first, with the computer(1) to move and the game going on
+    :return: list of flat boards
+    """
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        cells = [0] * 9
+        player = -1
+        plies = rng.randrange(0, 8)
+        for _ in range(plies):
+            if winner(cells) != 0 or 0 not in cells:
+                break
+            cells[rng.choice([cell for cell in range(9) if cells[cell] == 0])] = player
+            player = -player
+        if player == 1 and winner(cells) == 0 and 0 in cells:
+            positions.append(cells)
+    return positions
+
+
+def batch_nodes(boards, depth=3):
+    """
+    Interior nodes of the vectorized batch search, the positions minimax would expand: the root and every
+    sequence of at most 'depth' moves leaving the board not full
+    """
+    nodes = 0
+    for board in boards:
+        empties = int((board == 0).sum())
+        for plies in range(min(depth, empties - 1) + 1):
+            nodes += math.perm(empties, plies)
+    return nodes
+
+
+def run_tictactoe_job(workload, config, positions):
+    """
+    Search a list of positions with one engine, in a worker process. A move is optimal if it keeps the game
+    value, according to the solution table. Nodes expanded are the transposition table lookups (hits and
+    misses), every interior position looks up the table once, so positions answered by the solution table
+    count as 0
+    :return: result dict
+    """
+    solution = build_solution_table()
+    boards = [np.asarray(cells).reshape(3, 3) for cells in positions]
+    table = TranspositionTable()
+
+    start = time.perf_counter()
+    if config == 'batch':
+        moves = [tuple(move) for move in batch_minimax_search(np.stack(boards))]
+    elif config == 'bitboard':
+        moves = [MinimaxSearch(board, table=table, backend='bitboard') for board in boards]
+    else:
+        moves = [MinimaxSearch(board, table=table, mode=config) for board in boards]
+    wall_time = time.perf_counter() - start
+    nodes = batch_nodes(boards) if config == 'batch' else table.hits + table.misses
+
+    optimal = 0
+    for board, (row, col) in zip(boards, moves):
+        optimal_moves = int(solution[player_index(1), board_code(board)]) & MOVES_MASK
+        optimal += bool(optimal_moves >> int(row * 3 + col) & 1)
+
+    return {
+        'workload': workload,
+        'config': config,
+        'instances': len(boards),
+        'solved': len(moves),
+        'wall_time': wall_time,
+        'mean_time': wall_time / len(boards) if boards else None,
+        'nodes_expanded': nodes,
+        'peak_rss_kb': peak_rss_kb(),
+        'optimal_fraction': optimal / len(boards) if boards else None,
+    }
+
+
+def run_isolated(function, *args):
+    """
+    Run a job in a fresh process, so its peak RSS is its own
+    """
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+        return executor.submit(function, *args).result()
+
+
+def run_suite(args):
+    """
+    Run the selected workloads
+    :return: list of result dicts
+    """
+    results = []
+
+    def record(result):
+        results.append(result)
+        print('{workload:24s} {config:28s} solved {solved}/{instances} time {wall_time:.3f}s '
+              'rss {peak_rss_kb}KB optimal {optimal_fraction}'.format(**result), flush=True)
+
+    if 'puzzle8' in args.workloads:
+        bins = puzzle8_instances(args.per_bin, args.seed)
+        for name, instances in bins.items():
+            for config in args.puzzle_configs:
+                record(run_isolated(run_puzzle_job, 'puzzle8/' + name, config, instances, 3, args.time_limit,
+                                    args.max_nodes))
+
+    if 'korf100' in args.workloads:
+        instances = load_korf_instances(args.korf_file, args.korf_count)
+        for config in args.korf_configs:
+            record(run_isolated(run_puzzle_job, 'korf100', config, instances, 4, args.korf_time_limit,
+                                args.max_nodes))
+
+    if 'tictactoe' in args.workloads:
+        positions = tictactoe_positions(args.positions, args.seed)
+        if 'table' in args.engines and load_solution_table() is None:
+            print('building the tic tac toe solution table for the table engine', flush=True)
+            save_solution_table()
+        for config in args.engines:
+            record(run_isolated(run_tictactoe_job, 'tictactoe', config, positions))
+
+    return results
+
+
+def compare(results, baseline, thresholds):
+    """
+    Compare results with a baseline
+    :param results: list of result dicts
+    :param baseline: list of result dicts of an earlier run
+    :param thresholds: metric -> allowed ratio result / baseline for metrics where larger is worse
+    :return: list of regression messages
+    """
+    previous = {(result['workload'], result['config']): result for result in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get((result['workload'], result['config']))
+        if old is None:
+            continue
+        for metric, larger_is_worse in COMPARED_METRICS.items():
+            new_value, old_value = result.get(metric), old.get(metric)
+            if new_value is None or old_value is None:
+                continue
+            if larger_is_worse:
+                limit = old_value * thresholds[metric]
+                regressed = new_value > limit and new_value > old_value
+            else:
+                regressed = new_value < old_value
+            if regressed:
+                regressions.append('{} {} {}: {} -> {}'.format(result['workload'], result['config'], metric,
+                                                                old_value, new_value))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the puzzle solvers and the tic tac toe engines')
+    parser.add_argument('--workloads', default=','.join(WORKLOADS),
+                        help='comma separated subset of {}'.format(WORKLOADS))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--per-bin', type=int, default=10, help='8-puzzle instances per depth bin')
+    parser.add_argument('--puzzle-configs', default='astar/manhattan,astar/linear_conflict,ida_star/manhattan',
+                        help="comma separated solver/heuristic pairs of the 8-puzzle workload, heuristic 'none' "
+                             "runs the external solver as plain breadth-first search")
+    parser.add_argument('--time-limit', type=float, default=None, help='seconds per 8-puzzle instance')
+    parser.add_argument('--max-nodes', type=int, default=None, help='expanded nodes per puzzle instance')
+    parser.add_argument('--korf-file', default=KORF_FILE, help='file of the Korf 15-puzzle instances')
+    parser.add_argument('--korf-count', type=int, default=100)
+    parser.add_argument('--korf-configs', default='ida_star/pdb', help='comma separated solver/heuristic pairs')
+    parser.add_argument('--korf-time-limit', type=float, default=60.0, help='seconds per 15-puzzle instance')
+    parser.add_argument('--positions', type=int, default=200, help='number of tic tac toe positions')
+    parser.add_argument('--engines', default=','.join(TICTACTOE_ENGINES),
+                        help='comma separated subset of {}'.format(TICTACTOE_ENGINES))
+    parser.add_argument('--output', default=None, help='JSON file of the results')
+    parser.add_argument('--baseline', default=None, help='JSON result file to compare with')
+    parser.add_argument('--time-threshold', type=float, default=1.25, help='allowed wall time ratio')
+    parser.add_argument('--nodes-threshold', type=float, default=1.0, help='allowed nodes expanded ratio')
+    parser.add_argument('--rss-threshold', type=float, default=1.25, help='allowed peak RSS ratio')
+    args = parser.parse_args()
+
+    for name in ('workloads', 'puzzle_configs', 'korf_configs', 'engines'):
+        setattr(args, name, [value for value in getattr(args, name).split(',') if value])
+    for name in args.workloads:
+        if name not in WORKLOADS:
+            parser.error('unknown workload: {}'.format(name))
+    for config in args.puzzle_configs + args.korf_configs:
+        if config.split('/')[0] not in PUZZLE_SOLVERS or config.count('/') != 1:
+            parser.error('invalid solver/heuristic pair: {}'.format(config))
+    for engine in args.engines:
+        if engine not in TICTACTOE_ENGINES:
+            parser.error('unknown engine: {}'.format(engine))
+
+    results = run_suite(args)
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': np.__version__,
+            'args': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')},
+        },
+        'results': results,
+    }
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        thresholds = {'wall_time': args.time_threshold, 'nodes_expanded': args.nodes_threshold,
+                      'peak_rss_kb': args.rss_threshold}
+        regressions = compare(results, baseline, thresholds)
+        for message in regressions:
+            print('REGRESSION ' + message)
+        if regressions:
+            sys.exit(1)
+        print('No regression against {}'.format(args.baseline))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""
+Batch solving of many (init_state, dst_state) pairs with a process pool.
+Instances are sent to the workers as packed boards in chunks. Goal lookup tables are cached once per
+process, and pattern databases are built once in the parent and memory-mapped read-only by every worker.
+"""
+import os
+import time
+import traceback
+from collections import deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from compact_state import pack_board
+from distance_oracle import MAX_CELLS, get_oracle, oracle_search_for_puzzle_problem
+from external_search import external_search_for_puzzle_problem
+from heuristics import get_heuristic
+from puzzle_state import PuzzleState, astar_search_for_puzzle_problem, ida_star_search_for_puzzle_problem, \
+    is_solvable
+
+
+SOLVERS = {
+    'astar': astar_search_for_puzzle_problem,
+    'ida_star': ida_star_search_for_puzzle_problem,
+    'external': external_search_for_puzzle_problem,
+    'oracle': oracle_search_for_puzzle_problem,
+}
+
+# Solvers reading the goal tables of heuristics.get_heuristic(), the external search builds its own
+HEURISTIC_SOLVERS = ('astar', 'ida_star')
+
+"""
+Result of one instance
+    index: Position of the instance in the input
+    moves: list of int, None if the instance is not solved
+    status: 'solved', 'unsolvable', 'limit' (node or time limit reached) or 'error' (the solver failed on the
+            instance, e.g. a board too large for the 'oracle' solver)
+    elapsed: Solving time in seconds
+    error: Formatted traceback of the failure if status is 'error', None otherwise
+"""
+BatchResult = namedtuple('BatchResult', ['index', 'moves', 'status', 'elapsed', 'error'], defaults=(None,))
+
+_worker_config = {}
+
+
+def _init_worker(solver, heuristics, max_nodes, time_limit, pdb_dir):
+    """
+    Process pool initializer, keep the search options of this worker
+    """
+    _worker_config.update(solver=solver, heuristics=heuristics, max_nodes=max_nodes, time_limit=time_limit,
+                          pdb_dir=pdb_dir)
+
+
+def _solve_chunk(chunk):
+    """
+    Solve a chunk of instances in a worker
+    :param chunk: list of (index, square_size, init code, dst code)
+    :return: list of BatchResult
+    """
+    config = _worker_config
+    results = []
+    for index, square_size, init_code, dst_code in chunk:
+        start = time.perf_counter()
+        init_state = PuzzleState.from_code(init_code, square_size)
+        dst_state = PuzzleState.from_code(dst_code, square_size)
+
+        if not is_solvable(init_state, dst_state):
+            results.append(BatchResult(index, None, 'unsolvable', time.perf_counter() - start))
+            continue
+
+        error = None
+        try:
+            # Loads the cached goal tables of this process, or memory-maps the shared pattern database
+            _load_goal_tables(config['solver'], config['heuristics'], dst_state, config['pdb_dir'])
+            options = {'pdb_dir': config['pdb_dir']} if config['solver'] in HEURISTIC_SOLVERS else {}
+            moves = SOLVERS[config['solver']](init_state, dst_state, heuristics=config['heuristics'],
+                                              max_nodes=config['max_nodes'], time_limit=config['time_limit'],
+                                              **options)
+            status = 'solved' if moves is not None else 'limit'
+        except Exception:
+            # One failed instance must not end the whole batch, the traceback tells what failed
+            moves, status, error = None, 'error', traceback.format_exc()
+        results.append(BatchResult(index, moves, status, time.perf_counter() - start, error))
+    return results
+
+
+def _load_goal_tables(solver, heuristics, dst_state, pdb_dir):
+    """
+    Build or load the goal tables a solver reads, once per 'dst_state' and process
+    """
+    if solver == 'oracle':
+        # The distance table ignores the heuristics, it is stored next to the pattern databases and cached per
+        # process, so the solver finds it loaded. Boards too large for it are reported by the workers
+        if dst_state.square_size ** 2 <= MAX_CELLS:
+            get_oracle(dst_state, oracle_dir=pdb_dir)
+    elif solver in HEURISTIC_SOLVERS and heuristics is not None:
+        get_heuristic(heuristics, dst_state, pdb_dir=pdb_dir)
+
+
+def _to_code(state):
+    """
+    Pack a PuzzleState or a numpy board
+    :return: square_size, packed board
+    """
+    board = state.state if isinstance(state, PuzzleState) else np.asarray(state)
+    return board.shape[0], pack_board(board)
+
+
+def _chunks(pairs, chunksize, solver, heuristics, pdb_dir, goals):
+    """
+    Pack the input pairs into chunks, the goal tables of every new 'dst_state' are built in the parent
+    first so the workers only have to load them
+    """
+    chunk = []
+    for index, (init_state, dst_state) in enumerate(pairs):
+        square_size, init_code = _to_code(init_state)
+        _, dst_code = _to_code(dst_state)
+        if (square_size, dst_code) not in goals:
+            goals.add((square_size, dst_code))
+            _load_goal_tables(solver, heuristics, PuzzleState.from_code(dst_code, square_size), pdb_dir)
+
+        chunk.append((index, square_size, init_code, dst_code))
+        if len(chunk) == chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def solve_batch(pairs, heuristics='manhattan', solver='astar', max_workers=None, chunksize=16, ordered=True,
+                max_nodes=None, time_limit=None, pdb_dir=None):
+    """
+    Solve many puzzle instances in parallel
+    :param pairs: Iterable of (init_state, dst_state), each one is a PuzzleState or a square numpy board
+    :param heuristics: Heuristic function, see heuristics.py, None - plain breadth-first search of the
+                       'external' solver
+    :param solver: One of SOLVERS: 'astar', 'ida_star', 'external' or 'oracle'
+    :param max_workers: Number of worker processes, None - number of cores
+    :param chunksize: Number of instances sent to a worker at once
+    :param ordered: True - yield results in input order, False - yield results as they complete
+    :param max_nodes: Maximum number of expanded nodes per instance, None - no limit
+    :param time_limit: Maximum search time per instance in seconds, None - no limit
+    :param pdb_dir: Directory of the pattern database files, only used when heuristics = 'pdb' and by the
+                    distance tables of the 'oracle' solver
+    :return:
+        generator of BatchResult
+    """
+    if solver not in SOLVERS:
+        raise ValueError('Unknown solver: {}, expect one of {}'.format(solver, tuple(SOLVERS)))
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+
+    goals = set()
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                             initargs=(solver, heuristics, max_nodes, time_limit, pdb_dir)) as executor:
+        max_pending = 2 * max_workers
+        pending = deque() if ordered else set()
+
+        for chunk in _chunks(pairs, chunksize, solver, heuristics, pdb_dir, goals):
+            future = executor.submit(_solve_chunk, chunk)
+            if ordered:
+                pending.append(future)
+            else:
+                pending.add(future)
+
+            # Keep a bounded number of chunks in flight, so the input is consumed lazily
+            while len(pending) >= max_pending:
+                for result in _collect(pending, ordered):
+                    yield result
+
+        while pending:
+            for result in _collect(pending, ordered):
+                yield result
+
+
+def _collect(pending, ordered):
+    """
+    Wait for the next finished chunk: the oldest one if 'ordered', any one otherwise
+    """
+    if ordered:
+        return pending.popleft().result()
+
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    results = []
+    for future in done:
+        pending.remove(future)
+        results.extend(future.result())
+    return results
@@ -0,0 +1,122 @@
+"""
+Compact puzzle states used inside the search.
+A board is packed into a single python int: the tile at flat position p is stored in bits
+[p * bits, (p + 1) * bits), the 'blank' (-1) is stored as 0. 'bits' is 4 for boards up to 4x4
+and grows with the largest tile number for larger boards.
+"""
+import numpy as np
+
+
+def tile_bits(square_size):
+    """
+    Number of bits used to store one tile
+    :param square_size: Chessboard size
+    :return: bits per tile
+    """
+    return max(4, (square_size ** 2 - 1).bit_length())
+
+
+def pack_tiles(tiles, square_size):
+    """
+    Pack a flat sequence of tiles into an int
+    :param tiles: Flat sequence of tiles, '-1' or '0' indicates the 'blank'
+    :param square_size: Chessboard size
+    :return: code: int, packed board
+    """
+    bits = tile_bits(square_size)
+    code = 0
+    for pos, tile in enumerate(tiles):
+        if tile > 0:
+            code |= int(tile) << (pos * bits)
+    return code
+
+
+def unpack_tiles(code, square_size):
+    """
+    Unpack an int into a flat list of tiles, the 'blank' is returned as 0
+    :param code: Packed board
+    :param square_size: Chessboard size
+    :return: tiles: list of int
+    """
+    bits = tile_bits(square_size)
+    mask = (1 << bits) - 1
+    return [(code >> (pos * bits)) & mask for pos in range(square_size ** 2)]
+
+
+def pack_board(board):
+    """
+    Pack a 'square_size' x 'square_size' numpy board into an int
+    :param board: numpy array, '-1' indicates the 'blank'
+    :return: code: int, packed board
+    """
+    return pack_tiles(np.asarray(board).ravel().tolist(), board.shape[0])
+
+
+def unpack_board(code, square_size):
+    """
+    Unpack an int into a 'square_size' x 'square_size' numpy board, '-1' indicates the 'blank'
+    :param code: Packed board
+    :param square_size: Chessboard size
+    :return: board: numpy array
+    """
+    board = np.asarray(unpack_tiles(code, square_size)).reshape(square_size, square_size)
+    board[board == 0] = -1
+    return board
+
+
+def blank_index(code, square_size):
+    """
+    Flat position of the 'blank' in a packed board
+    :param code: Packed board
+    :param square_size: Chessboard size
+    :return: index: int, '-1' indicates the board has no 'blank'
+    """
+    bits = tile_bits(square_size)
+    mask = (1 << bits) - 1
+    for pos in range(square_size ** 2):
+        if (code >> (pos * bits)) & mask == 0:
+            return pos
+    return -1
+
+
+def swap_blank(code, bits, src, dst):
+    """
+    Move the 'blank' from flat position 'src' to 'dst', the tile on 'dst' goes to 'src'
+    :param code: Packed board
+    :param bits: Bits per tile
+    :param src: Current 'blank' position
+    :param dst: Future 'blank' position
+    :return:
+        next_code: int, packed board after the move
+        tile: int, the tile which has been moved
+    """
+    tile = (code >> (dst * bits)) & ((1 << bits) - 1)
+    return code - (tile << (dst * bits)) + (tile << (src * bits)), tile
+
+
+class CompactState(object):
+    """
+    Search node with a packed board
+    Attr:
+        code: Packed board
+        blank: Flat position of the 'blank'
+        g: The cost from initial state to current state
+        h: The value of heuristic function
+        parent: Index of the parent node in the search node table, '-1' for the root
+        move: The previous operation (int) to get to current state
+    """
+    __slots__ = ('code', 'blank', 'g', 'h', 'parent', 'move')
+
+    def __init__(self, code, blank, g=0, h=0, parent=-1, move=None):
+        self.code = code
+        self.blank = blank
+        self.g = g
+        self.h = h
+        self.parent = parent
+        self.move = move
+
+    def __eq__(self, other):
+        return self.code == other.code
+
+    def __hash__(self):
+        return hash(self.code)
@@ -0,0 +1,186 @@
+"""
+Exact distance oracle of small puzzles.
+One breadth-first search from 'dst_state' over the whole state space stores the exact distance of every board
+in a byte array indexed by the Lehmer code (permutation rank) of its tiles, 9! entries for the 8-puzzle of which
+the 181440 reachable ones get a distance. The table is saved as an .npy file next to the pattern databases and
+memory-mapped when it is loaded. An optimal path is then rebuilt greedily: from every board one child is exactly
+one move closer to the goal.
+"""
+import math
+import os
+import time
+
+import numpy as np
+
+from compact_state import pack_board, tile_bits, unpack_tiles
+from external_search import expand_tiles
+from move_table import successors, target_table
+from pattern_database import PDB_DIR, UNREACHABLE, save_table
+from search_stats import SearchStats
+
+
+# Largest board whose full state space is stored
+MAX_CELLS = 9
+
+_oracle_cache = {}
+
+
+def lehmer_rank(tiles):
+    """
+    Permutation rank of a board
+    :param tiles: Flat list of tiles, the 'blank' is 0
+    :return:
+        rank: int in [0, len(tiles)!)
+    """
+    rank, size = 0, len(tiles)
+    for i in range(size - 1):
+        tile = tiles[i]
+        smaller = 0
+        for j in range(i + 1, size):
+            if tiles[j] < tile:
+                smaller += 1
+        rank += smaller * math.factorial(size - 1 - i)
+    return rank
+
+
+def lehmer_ranks(tiles):
+    """
+    Vectorized lehmer_rank()
+    :param tiles: (k, cells) array of tiles, the 'blank' is 0
+    :return: (k,) int64 array of ranks
+    """
+    size = tiles.shape[1]
+    ranks = np.zeros(len(tiles), dtype=np.int64)
+    for i in range(size - 1):
+        smaller = (tiles[:, i + 1:] < tiles[:, i:i + 1]).sum(axis=1)
+        ranks += smaller * math.factorial(size - 1 - i)
+    return ranks
+
+
+def build_distance_table(goal_tiles, square_size):
+    """
+    Build the exact distance of every board by a layered BFS from the goal
+    :param goal_tiles: Flat list of goal tiles, the 'blank' is 0
+    :param square_size: Chessboard size
+    :return:
+        table: uint8 numpy array of shape (square_size ** 2)!, indexed by lehmer_rank(), UNREACHABLE for boards
+        of the other parity
+    """
+    targets = np.array(target_table(square_size), dtype=np.int64)
+    table = np.full(math.factorial(square_size ** 2), UNREACHABLE, dtype=np.uint8)
+    frontier = np.array([goal_tiles], dtype=np.uint8)
+    table[lehmer_ranks(frontier)] = 0
+
+    distance = 0
+    while len(frontier):
+        distance += 1
+        children, _ = expand_tiles(frontier, targets)
+        ranks = lehmer_ranks(children)
+        new = table[ranks] == UNREACHABLE
+        ranks, first = np.unique(ranks[new], return_index=True)
+        table[ranks] = distance
+        frontier = children[new][first]
+    return table
+
+
+class DistanceOracle(object):
+    """
+    Exact distances to one destination state
+    Attr:
+        square_size: Chessboard size
+        dst_code: Packed destination board
+        table: Memory-mapped distance table, see build_distance_table()
+    """
+    def __init__(self, dst_code, square_size=3, oracle_dir=None):
+        if square_size ** 2 > MAX_CELLS:
+            raise ValueError('The distance oracle only covers boards up to {} cells, get {}x{}'.format(
+                MAX_CELLS, square_size, square_size))
+        self.square_size = square_size
+        self.dst_code = dst_code
+        self.bits = tile_bits(square_size)
+        self.mask = (1 << self.bits) - 1
+
+        oracle_dir = oracle_dir if oracle_dir is not None else PDB_DIR
+        path = os.path.join(oracle_dir, '{0}x{0}_{1:x}_distances.npy'.format(square_size, dst_code))
+        if not os.path.exists(path):
+            save_table(path, build_distance_table(unpack_tiles(dst_code, square_size), square_size))
+        self.table = np.load(path, mmap_mode='r')
+
+    def distance(self, code):
+        """
+        Exact distance of a packed board
+        :param code: Packed board
+        :return: number of moves to the destination, None if it is unreachable
+        """
+        tiles = [(code >> (pos * self.bits)) & self.mask for pos in range(self.square_size ** 2)]
+        distance = int(self.table[lehmer_rank(tiles)])
+        return distance if distance != UNREACHABLE else None
+
+    def solve(self, code, stats=None):
+        """
+        Rebuild an optimal path by following decreasing distances
+        :param code: Packed board
+        :param stats: SearchStats to count the visited boards, None - no statistics
+        :return:
+            moves: list of int, None if the destination is unreachable
+        """
+        distance = self.distance(code)
+        if distance is None:
+            return None
+
+        moves = []
+        blank = unpack_tiles(code, self.square_size).index(0)
+        while distance > 0:
+            for move, next_code, next_blank, _ in successors(code, blank, self.square_size):
+                if stats is not None:
+                    stats.nodes_generated += 1
+                if self.distance(next_code) == distance - 1:
+                    break
+            moves.append(move)
+            code, blank, distance = next_code, next_blank, distance - 1
+            if stats is not None:
+                stats.nodes_expanded += 1
+        return moves
+
+
+def get_oracle(dst_state, oracle_dir=None):
+    """
+    Get the distance oracle of a destination state, built once per 'dst_state' and loaded once per process
+    :param dst_state: Destination puzzle state
+    :param oracle_dir: Directory of the distance tables, None - the pattern database directory
+    :return: DistanceOracle
+    """
+    square_size = dst_state.state.shape[0]
+    key = (pack_board(dst_state.state), square_size)
+    if key not in _oracle_cache:
+        _oracle_cache[key] = DistanceOracle(key[0], square_size, oracle_dir=oracle_dir)
+    return _oracle_cache[key]
+
+
+def oracle_search_for_puzzle_problem(init_state, dst_state, heuristics=None, max_nodes=None, time_limit=None,
+                                     stats=None, oracle_dir=None):
+    """
+    Find the shortest path from init_state to dst_state by looking up the exact distances
+    The signature follows the other solvers, 'heuristics', 'max_nodes' and 'time_limit' are not needed: the path
+    is rebuilt in (length of the path) * 4 lookups
+    :param init_state:  Initial puzzle state, at most MAX_CELLS cells
+    :param dst_state:   Destination puzzle state
+    :param heuristics:  Ignored
+    :param max_nodes:   Ignored
+    :param time_limit:  Ignored
+    :param stats:       SearchStats to fill while searching, None - no statistics
+    :param oracle_dir:  Directory of the distance tables, None - the pattern database directory
+    :return:  All operations needed to be performed from init_state to dst_state
+        moves: list of int, same format as astar_search_for_puzzle_problem()
+        None if the instance is unsolvable
+    """
+    if stats is None:
+        stats = SearchStats()
+    search_start = time.perf_counter()
+
+    oracle = get_oracle(dst_state, oracle_dir=oracle_dir)
+    move_list = oracle.solve(pack_board(init_state.state), stats=stats)
+
+    stats.elapsed = time.perf_counter() - search_start
+    stats.solution_depth = len(move_list) if move_list is not None else None
+    return move_list
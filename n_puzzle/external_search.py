@@ -0,0 +1,370 @@
+"""
+External-memory search for puzzles whose frontier does not fit in memory.
+Breadth-first iterative-deepening A* (breadth-first heuristic search): for an upper bound U the search space is
+explored layer by layer in breadth-first order, children with g + h > U are pruned, and if the goal is not found
+U is raised to the smallest pruned f and the search starts over.
+Every layer is a file of sorted, unique packed boards. A layer is expanded in blocks read through memory maps,
+its children are sorted in memory-sized runs written to disk, and the runs are merged into the next layer file.
+Duplicates are detected during this sort-merge: a child of layer d can only lie in layer d - 1, d or d + 1
+in an undirected graph, so the two previous layers are streamed alongside the runs and subtracted.
+The path is rebuilt backwards from the goal by looking up a neighbour of the current state in each earlier layer.
+The working arrays stay within 'memory_limit' bytes, the layers themselves live on disk.
+"""
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from compact_state import tile_bits
+from move_table import INVERSE_MOVE, target_table
+from puzzle_state import is_solvable
+from search_stats import SearchStats
+
+
+EXTERNAL_HEURISTICS = ('manhattan', 'hamming', None)
+
+# Smallest number of records per block, smaller blocks are dominated by the cost of opening memory maps
+MIN_BLOCK = 4096
+
+# Largest number of runs merged at once, more runs are merged in several passes
+MAX_FAN_IN = 16
+
+
+class RecordFormat(object):
+    """
+    Fixed-size records of packed boards, sortable as raw bytes
+    A board is split into 64-bit words of whole tiles, the words are stored big-endian with the most
+    significant word first, so the byte order of two records is the numeric order of their boards
+    Attr:
+        square_size: Chessboard size
+        words: Number of 64-bit words per record
+        dtype: numpy void dtype of a record
+    """
+    def __init__(self, square_size):
+        self.square_size = square_size
+        self.cells = square_size ** 2
+        self.bits = tile_bits(square_size)
+        per_word = 64 // self.bits
+        self.words = -(-self.cells // per_word)
+        self.word_of = [pos // per_word for pos in range(self.cells)]
+        self.shift = [np.uint64((pos % per_word) * self.bits) for pos in range(self.cells)]
+        self.mask = np.uint64((1 << self.bits) - 1)
+        self.dtype = np.dtype((np.void, 8 * self.words))
+
+    def pack(self, tiles):
+        """
+        Pack boards into records
+        :param tiles: (k, cells) array of tiles, the 'blank' is 0
+        :return: (k,) array of records
+        """
+        words = np.zeros((len(tiles), self.words), dtype=np.uint64)
+        for pos in range(self.cells):
+            words[:, self.word_of[pos]] |= tiles[:, pos].astype(np.uint64) << self.shift[pos]
+        return np.ascontiguousarray(words[:, ::-1]).astype('>u8').view(self.dtype).ravel()
+
+    def unpack(self, records):
+        """
+        Unpack records into boards
+        :param records: (k,) array of records
+        :return: (k, cells) uint8 array of tiles, the 'blank' is 0
+        """
+        words = np.ascontiguousarray(records).view('>u8').reshape(-1, self.words)[:, ::-1].astype(np.uint64)
+        tiles = np.empty((len(records), self.cells), dtype=np.uint8)
+        for pos in range(self.cells):
+            tiles[:, pos] = (words[:, self.word_of[pos]] >> self.shift[pos]) & self.mask
+        return tiles
+
+
+def expand_tiles(tiles, targets):
+    """
+    Generate all children of a block of boards
+    :param tiles: (k, cells) array of tiles, the 'blank' is 0
+    :param targets: (cells, 4) array, target_table() of the board size
+    :return:
+        children: (m, cells) array of tiles
+        moves: (m,) array, operation leading to every child
+    """
+    blank = np.argmax(tiles == 0, axis=1)
+    children, moves = [], []
+    for move in range(4):
+        dst = targets[blank, move]
+        valid = dst >= 0
+        child = tiles[valid]
+        rows = np.arange(len(child))
+        child[rows, blank[valid]] = child[rows, dst[valid]]
+        child[rows, dst[valid]] = 0
+        children.append(child)
+        moves.append(np.full(len(child), move, dtype=np.int8))
+    return np.concatenate(children), np.concatenate(moves)
+
+
+def heuristic_table(metric, dst_tiles, square_size):
+    """
+    Cost table of the vectorized heuristics
+    :return: (cells, cells) array, cost[tile, pos] of 'tile' standing on 'pos', h is the sum over the board
+    """
+    cells = square_size ** 2
+    cost = np.zeros((cells, cells), dtype=np.int16)
+    if metric is None:
+        return cost
+    for tile in range(1, cells):
+        goal = dst_tiles.index(tile)
+        for pos in range(cells):
+            if metric == 'manhattan':
+                cost[tile, pos] = abs(goal // square_size - pos // square_size) + \
+                    abs(goal % square_size - pos % square_size)
+            else:
+                cost[tile, pos] = goal != pos
+    return cost
+
+
+def _read(path, dtype, start, count):
+    """
+    Read records [start, start + count) of a file through a short-lived memory map
+    """
+    if count <= 0:
+        return np.empty(0, dtype=dtype)
+    view = np.memmap(path, dtype=dtype, mode='r', offset=start * dtype.itemsize, shape=(count,))
+    block = np.array(view)
+    del view
+    return block
+
+
+def _contains(path, dtype, length, record):
+    """
+    Binary search of a record in a sorted layer file
+    """
+    if length == 0:
+        return False
+    view = np.memmap(path, dtype=dtype, mode='r', shape=(length,))
+    index = int(np.searchsorted(view, record))
+    found = index < length and view[index] == record
+    del view
+    return bool(found)
+
+
+def merge_runs(runs, previous, out_path, dtype, memory_limit, goal):
+    """
+    Merge sorted runs into one sorted layer without duplicates, dropping the records of the previous layers
+    At most MAX_FAN_IN runs are merged at once, more runs are first merged group by group into longer runs
+    :param runs: list of (path, length) of sorted unique runs, the files are removed
+    :param previous: list of (path, length) of sorted layers to subtract
+    :param out_path: Path of the merged layer
+    :param dtype: Record dtype
+    :param memory_limit: Bytes of the working arrays
+    :param goal: Record to look for
+    :return:
+        length: number of records of the merged layer
+        found: True if 'goal' is in the merged layer
+    """
+    passes = 0
+    while len(runs) > MAX_FAN_IN:
+        merged_runs = []
+        for start in range(0, len(runs), MAX_FAN_IN):
+            group = runs[start:start + MAX_FAN_IN]
+            path = '{}.pass{}_{}'.format(out_path, passes, len(merged_runs))
+            length, _ = _merge_pass(group, [], path, dtype, memory_limit, None)
+            merged_runs.append((path, length))
+            for run_path, _ in group:
+                os.remove(run_path)
+        runs = merged_runs
+        passes += 1
+
+    result = _merge_pass(runs, previous, out_path, dtype, memory_limit, goal)
+    for run_path, _ in runs:
+        os.remove(run_path)
+    return result
+
+
+def _merge_pass(runs, previous, out_path, dtype, memory_limit, goal):
+    """
+    One merge of all 'runs' into 'out_path', see merge_runs(), 'goal' None - no goal test
+    """
+    block = max(MIN_BLOCK, memory_limit // (4 * dtype.itemsize * (len(runs) + len(previous) + 1)))
+    positions = [0] * len(runs)
+    prev_positions = [0] * len(previous)
+    length, found = 0, False
+
+    with open(out_path, 'wb') as out:
+        while True:
+            blocks = [(i, _read(path, dtype, positions[i], min(block, size - positions[i])))
+                      for i, (path, size) in enumerate(runs) if positions[i] < size]
+            if not blocks:
+                break
+
+            # Everything up to the smallest last record of an unfinished run can be merged now
+            partial = [data[-1] for i, data in blocks if positions[i] + len(data) < runs[i][1]]
+            cutoff = np.sort(np.array(partial, dtype=dtype))[0] if partial else None
+            parts = []
+            for i, data in blocks:
+                count = len(data) if cutoff is None else int(np.searchsorted(data, cutoff, side='right'))
+                parts.append(data[:count])
+                positions[i] += count
+            merged = np.unique(np.concatenate(parts))
+
+            # Stream the previous layers up to the last merged record and drop what they contain
+            top = merged[-1]
+            for j, (path, size) in enumerate(previous):
+                while prev_positions[j] < size:
+                    data = _read(path, dtype, prev_positions[j], min(block, size - prev_positions[j]))
+                    count = int(np.searchsorted(data, top, side='right'))
+                    merged = merged[~np.isin(merged, data[:count], assume_unique=True)]
+                    prev_positions[j] += count
+                    if count < len(data):
+                        break
+
+            if goal is not None:
+                found = found or bool(np.isin(goal, merged).any())
+            merged.tofile(out)
+            length += len(merged)
+    return length, found
+
+
+def external_search_for_puzzle_problem(init_state, dst_state, heuristics='manhattan', memory_limit=256 << 20,
+                                       work_dir=None, max_nodes=None, time_limit=None, stats=None):
+    """
+    Use disk-based breadth-first iterative-deepening A* to find the shortest path from init_state to dst_state
+    :param init_state:  Initial puzzle state
+    :param dst_state:   Destination puzzle state
+    :param heuristics:  'manhattan', 'hamming' or None (plain breadth-first frontier search)
+    :param memory_limit: Bytes of the working arrays, the layer files are kept on disk. Blocks never get smaller
+                        than MIN_BLOCK records, so very small limits are exceeded rather than slowing the search down
+    :param work_dir:    Directory of the layer files, None - the system temporary directory. The files are removed
+                        when the search returns
+    :param max_nodes:   Maximum number of expanded nodes over all iterations, None - no limit
+    :param time_limit:  Maximum search time in seconds, None - no limit
+    :param stats:       SearchStats to fill while searching (counters only), None - no statistics
+    :return:  All operations needed to be performed from init_state to dst_state
+        moves: list of int, same format as astar_search_for_puzzle_problem()
+        None if the instance is unsolvable or a limit is reached
+    """
+    if heuristics not in EXTERNAL_HEURISTICS:
+        raise ValueError('Unknown heuristic: {}, expect one of {}'.format(heuristics, EXTERNAL_HEURISTICS))
+    if stats is None:
+        stats = SearchStats()
+    search_start = time.perf_counter()
+
+    def finish(move_list):
+        stats.elapsed = time.perf_counter() - search_start
+        stats.solution_depth = len(move_list) if move_list is not None else None
+        return move_list
+
+    if not is_solvable(init_state, dst_state):
+        return finish(None)
+
+    square_size = init_state.square_size
+    fmt = RecordFormat(square_size)
+    dtype = fmt.dtype
+    targets = np.array(target_table(square_size), dtype=np.int64)
+    init_tiles = np.array([[max(tile, 0) for tile in init_state.state.ravel().tolist()]], dtype=np.uint8)
+    dst_tiles = [max(tile, 0) for tile in dst_state.state.ravel().tolist()]
+    goal = fmt.pack(np.array([dst_tiles], dtype=np.uint8))[0]
+    cost = heuristic_table(heuristics, dst_tiles, square_size)
+    cells = np.arange(square_size ** 2)
+
+    def evaluate(tiles):
+        return cost[tiles, cells].sum(axis=1)
+
+    if fmt.pack(init_tiles)[0] == goal:
+        return finish([])
+
+    # Working array sizes: parents per expansion block and records per sorted run
+    per_parent = 4 * (8 * fmt.cells + 4 * dtype.itemsize)
+    parent_block = max(MIN_BLOCK, memory_limit // (2 * per_parent))
+    run_capacity = max(MIN_BLOCK, memory_limit // (8 * dtype.itemsize))
+
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+    root = tempfile.mkdtemp(prefix='external_search_', dir=work_dir)
+    expanded = 0
+
+    def over_limit():
+        if max_nodes is not None and expanded >= max_nodes:
+            return True
+        return deadline is not None and time.perf_counter() > deadline
+
+    def layer_path(depth):
+        return os.path.join(root, 'layer_{}.bin'.format(depth))
+
+    def rebuild_path(layers):
+        '''
+        Walk back from the goal, one neighbour in every earlier layer
+        '''
+        moves = []
+        current = np.array([dst_tiles], dtype=np.uint8)
+        for depth in range(len(layers) - 2, -1, -1):
+            children, child_moves = expand_tiles(current, targets)
+            records = fmt.pack(children)
+            for index in range(len(children)):
+                if _contains(layers[depth][0], dtype, layers[depth][1], records[index]):
+                    # The 'blank' moved from the current state to its parent, the inverse move goes forward
+                    moves.append(INVERSE_MOVE[int(child_moves[index])])
+                    current = children[index:index + 1]
+                    break
+        moves.reverse()
+        return moves
+
+    try:
+        bound = int(evaluate(init_tiles)[0]) if heuristics is not None else float('inf')
+        while True:
+            fmt.pack(init_tiles).tofile(layer_path(0))
+            layers = [(layer_path(0), 1)]
+            next_bound = float('inf')
+
+            while True:
+                depth = len(layers) - 1
+                path, size = layers[-1]
+                runs, buffer, buffered, kept = [], [], 0, 0
+
+                def flush():
+                    run = np.unique(np.concatenate(buffer))
+                    run_path = os.path.join(root, 'run_{}.bin'.format(len(runs)))
+                    run.tofile(run_path)
+                    runs.append((run_path, len(run)))
+                    del buffer[:]
+
+                # Expand the layer block by block, sorted runs of children go to disk
+                for start in range(0, size, parent_block):
+                    if over_limit():
+                        return finish(None)
+                    parents = fmt.unpack(_read(path, dtype, start, min(parent_block, size - start)))
+                    expanded += len(parents)
+                    children, _ = expand_tiles(parents, targets)
+                    stats.nodes_expanded = expanded
+                    stats.nodes_generated += len(children)
+
+                    f = depth + 1 + evaluate(children)
+                    keep = f <= bound
+                    if not keep.all():
+                        next_bound = min(next_bound, int(f[~keep].min()))
+                    kept += int(keep.sum())
+                    records = np.unique(fmt.pack(children[keep]))
+                    buffer.append(records)
+                    buffered += len(records)
+                    if buffered >= run_capacity:
+                        flush()
+                        buffered = 0
+                if buffer:
+                    flush()
+
+                next_path = layer_path(depth + 1)
+                previous = layers[-2:]
+                length, found = merge_runs(runs, previous, next_path, dtype, memory_limit, goal)
+                stats.duplicates_dropped += kept - length
+                stats.peak_open = max(stats.peak_open, length)
+                layers.append((next_path, length))
+
+                if found:
+                    return finish(rebuild_path(layers))
+                if length == 0:
+                    break
+
+            # No solution within the bound, start over with the smallest pruned f
+            for layer, _ in layers:
+                os.remove(layer)
+            if next_bound == float('inf'):
+                return finish(None)
+            bound = next_bound
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
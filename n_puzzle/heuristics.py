@@ -0,0 +1,216 @@
+"""
+Heuristic functions for the n-puzzle search.
+A Heuristic precomputes the goal lookup tables of one 'dst_state' once, evaluates a whole board in
+vectorized form, and updates the value of a child from its parent in O(1) when the child differs from
+the parent by one tile swapped with the 'blank'.
+Boards are packed ints, see compact_state.py.
+"""
+import math
+import os
+
+import numpy as np
+
+from compact_state import pack_board, tile_bits, unpack_tiles
+from pattern_database import PDB_DIR, PatternDatabase
+
+
+# Names accepted by the 'heuristics' argument of the search
+HEURISTICS = ('euclidean', 'blank_pos', 'chebyshev', 'manhattan', 'hamming', 'mix', 'linear_conflict', 'pdb')
+
+# Heuristics which never overestimate the true cost
+ADMISSIBLE_HEURISTICS = ('blank_pos', 'chebyshev', 'manhattan', 'hamming', 'mix', 'linear_conflict', 'pdb')
+
+_heuristic_cache = {}
+
+
+class Heuristic(object):
+    """
+    Heuristic function of one destination state
+    Attr:
+        metric: Name of the heuristic, one of HEURISTICS
+        square_size: Chessboard size
+        goal_pos: goal_pos[tile] is the flat goal position of 'tile', the 'blank' is tile 0
+        manhattan_table: manhattan_table[tile][pos] is the Manhattan distance of 'tile' on 'pos' to its goal
+        hamming_table: hamming_table[tile][pos] is 1 if 'tile' on 'pos' is misplaced
+        square_table: square_table[tile][pos] is the squared difference between 'tile' and the goal tile on 'pos'
+    """
+    def __init__(self, metric, dst_code, square_size):
+        if metric not in HEURISTICS or metric == 'pdb':
+            raise ValueError('Unknown heuristics: {}, expect one of {}'.format(metric, HEURISTICS))
+
+        self.metric = metric
+        self.square_size = square_size
+        self.bits = tile_bits(square_size)
+        self.mask = (1 << self.bits) - 1
+
+        size = square_size ** 2
+        goal_tiles = np.asarray(unpack_tiles(dst_code, square_size))
+        self.goal_tiles = goal_tiles
+        self.goal_pos = np.zeros(goal_tiles.max() + 1, dtype=int)
+        self.goal_pos[goal_tiles] = np.arange(size)
+        self.goal_row = self.goal_pos // square_size
+        self.goal_col = self.goal_pos % square_size
+
+        # Per (tile, position) lookup tables, row 0 is the 'blank'
+        rows = np.arange(size) // square_size
+        cols = np.arange(size) % square_size
+        manhattan = np.abs(rows[None, :] - self.goal_row[:, None]) + np.abs(cols[None, :] - self.goal_col[:, None])
+        hamming = (np.arange(size)[None, :] != self.goal_pos[:, None]).astype(int)
+        manhattan[0, :] = 0
+        hamming[0, :] = 0
+        values = np.where(np.arange(len(self.goal_pos)) == 0, -1, np.arange(len(self.goal_pos)))
+        goal_values = np.where(goal_tiles == 0, -1, goal_tiles)
+        squares = (values[:, None] - goal_values[None, :]) ** 2
+
+        self.manhattan_table = manhattan.tolist()
+        self.hamming_table = hamming.tolist()
+        self.square_table = squares.tolist()
+        self.blank_manhattan = (np.abs(rows - self.goal_row[0]) + np.abs(cols - self.goal_col[0])).tolist()
+        self.blank_chebyshev = np.maximum(np.abs(rows - self.goal_row[0]), np.abs(cols - self.goal_col[0])).tolist()
+
+    def evaluate(self, code):
+        """
+        Evaluate a packed board from scratch
+        :param code: Packed board
+        :return: h
+        """
+        tiles = np.asarray(unpack_tiles(code, self.square_size))
+        positions = np.arange(tiles.size)
+        blank = int(np.argmax(tiles == 0))
+
+        if self.metric == 'euclidean':
+            values = np.where(tiles == 0, -1, tiles)
+            goal_values = np.where(self.goal_tiles == 0, -1, self.goal_tiles)
+            return math.sqrt(int(np.sum((values - goal_values) ** 2)))
+        elif self.metric == 'blank_pos':
+            return self.blank_manhattan[blank]
+        elif self.metric == 'chebyshev':
+            return self.blank_chebyshev[blank]
+
+        tile_mask = tiles != 0
+        manhattan = int(np.sum((np.abs(positions // self.square_size - self.goal_row[tiles]) +
+                                np.abs(positions % self.square_size - self.goal_col[tiles]))[tile_mask]))
+        hamming = int(np.sum((self.goal_pos[tiles] != positions) & tile_mask))
+
+        if self.metric == 'manhattan':
+            return manhattan
+        elif self.metric == 'hamming':
+            return hamming
+        elif self.metric == 'mix':
+            return 0.5 * manhattan + 0.5 * hamming
+        else:
+            board = tiles.reshape(self.square_size, self.square_size)
+            conflicts = sum(self.line_conflict(board[i, :].tolist(), i, 0) for i in range(self.square_size))
+            conflicts += sum(self.line_conflict(board[:, i].tolist(), i, 1) for i in range(self.square_size))
+            return manhattan + 2 * conflicts
+
+    def update(self, parent_h, code, tile, src, dst):
+        """
+        Get the h of a child from its parent, the child is the parent with 'tile' moved from 'src' to 'dst'
+        (so the 'blank' moved from 'dst' to 'src')
+        :param parent_h: h of the parent
+        :param code: Packed board of the child
+        :param tile: The tile which has been moved
+        :param src: Flat position of 'tile' in the parent
+        :param dst: Flat position of 'tile' in the child
+        :return: h of the child
+        """
+        metric = self.metric
+        if metric == 'manhattan':
+            return parent_h - self.manhattan_table[tile][src] + self.manhattan_table[tile][dst]
+        elif metric == 'hamming':
+            return parent_h - self.hamming_table[tile][src] + self.hamming_table[tile][dst]
+        elif metric == 'mix':
+            return parent_h + 0.5 * (self.manhattan_table[tile][dst] - self.manhattan_table[tile][src] +
+                                     self.hamming_table[tile][dst] - self.hamming_table[tile][src])
+        elif metric == 'blank_pos':
+            return self.blank_manhattan[src]
+        elif metric == 'chebyshev':
+            return self.blank_chebyshev[src]
+        elif metric == 'euclidean':
+            table = self.square_table
+            squares = round(parent_h * parent_h)
+            squares += table[tile][dst] + table[0][src] - table[tile][src] - table[0][dst]
+            return math.sqrt(squares)
+        else:
+            h = parent_h - self.manhattan_table[tile][src] + self.manhattan_table[tile][dst]
+            # Only the two lines across the move change: the columns of a horizontal move,
+            # the rows of a vertical move
+            axis = 1 if abs(src - dst) == 1 else 0
+            for pos in (src, dst):
+                index = self.line_index(pos, axis)
+                child_line = self.get_line(code, index, axis)
+                parent_line = list(child_line)
+                if pos == src:
+                    parent_line[self.line_offset(src, axis)] = tile
+                else:
+                    parent_line[self.line_offset(dst, axis)] = 0
+                h += 2 * (self.line_conflict(child_line, index, axis) - self.line_conflict(parent_line, index, axis))
+            return h
+
+    def line_index(self, pos, axis):
+        """
+        Index of the row (axis = 0) or the column (axis = 1) of a flat position
+        """
+        return pos // self.square_size if axis == 0 else pos % self.square_size
+
+    def line_offset(self, pos, axis):
+        """
+        Offset of a flat position inside its row (axis = 0) or its column (axis = 1)
+        """
+        return pos % self.square_size if axis == 0 else pos // self.square_size
+
+    def get_line(self, code, index, axis):
+        """
+        Get a row (axis = 0) or a column (axis = 1) of a packed board
+        """
+        if axis == 0:
+            positions = range(index * self.square_size, (index + 1) * self.square_size)
+        else:
+            positions = range(index, self.square_size ** 2, self.square_size)
+        return [(code >> (pos * self.bits)) & self.mask for pos in positions]
+
+    def line_conflict(self, line, index, axis):
+        """
+        Count the tiles which have to leave a line to resolve its linear conflicts.
+        Tiles whose goal lies in this line must keep their goal order, the tiles outside the longest
+        increasing subsequence of goal offsets have to step out of the line (2 extra moves each)
+        :param line: Tiles of the line
+        :param index: Row (axis = 0) or column (axis = 1) index of the line
+        :param axis: 0 - row, 1 - column
+        :return: number of tiles to remove
+        """
+        goal_lines = self.goal_row if axis == 0 else self.goal_col
+        goal_offsets = self.goal_col if axis == 0 else self.goal_row
+        offsets = [goal_offsets[tile] for tile in line if tile != 0 and goal_lines[tile] == index]
+        if len(offsets) < 2:
+            return 0
+
+        # Longest increasing subsequence, lines are short
+        longest = [1] * len(offsets)
+        for i in range(len(offsets)):
+            for j in range(i):
+                if offsets[j] < offsets[i] and longest[j] + 1 > longest[i]:
+                    longest[i] = longest[j] + 1
+        return len(offsets) - max(longest)
+
+
+def get_heuristic(metric, dst_state, pdb_dir=None):
+    """
+    Get the heuristic function of a destination state, lookup tables are built once per 'dst_state', and pattern
+    databases once per 'dst_state' and directory
+    :param metric: Name of the heuristic, one of HEURISTICS
+    :param dst_state: Destination puzzle state
+    :param pdb_dir: Directory of the pattern database files, only used when metric = 'pdb', None - PDB_DIR
+    :return: Heuristic or PatternDatabase
+    """
+    square_size = dst_state.state.shape[0]
+    key = (metric, pack_board(dst_state.state), square_size)
+    if metric == 'pdb':
+        key += (os.path.abspath(pdb_dir if pdb_dir is not None else PDB_DIR),)
+    if key not in _heuristic_cache:
+        if metric == 'pdb':
+            _heuristic_cache[key] = PatternDatabase(key[1], square_size, pdb_dir=pdb_dir)
+        else:
+            _heuristic_cache[key] = Heuristic(metric, key[1], square_size)
+    return _heuristic_cache[key]
@@ -0,0 +1,89 @@
+"""
+Precomputed move tables for the n-puzzle.
+For every board size the table maps a 'blank' flat position to the operations which are valid there
+and the 'blank' position after each of them. Operations are stored as int, in the same order as Move:
+0 - up, 1 - down, 2 - left, 3 - right (the direction the 'blank' moves to).
+"""
+from compact_state import swap_blank, tile_bits
+
+
+# (operation, row offset, col offset) of the 'blank'
+MOVE_OFFSETS = ((0, -1, 0), (1, 1, 0), (2, 0, -1), (3, 0, 1))
+
+# Operation which undoes each operation
+INVERSE_MOVE = (1, 0, 3, 2)
+
+_neighbor_tables = {}
+_target_tables = {}
+
+
+def neighbor_table(square_size):
+    """
+    Get the neighbor table of a board size, it is built once and cached
+    :param square_size: Chessboard size
+    :return:
+        table: tuple, table[blank] is a tuple of (operation, next blank) for every valid operation
+    """
+    if square_size not in _neighbor_tables:
+        table = []
+        for pos in range(square_size ** 2):
+            row, col = divmod(pos, square_size)
+            neighbors = []
+            for move, d_row, d_col in MOVE_OFFSETS:
+                dst_row, dst_col = row + d_row, col + d_col
+                if 0 <= dst_row < square_size and 0 <= dst_col < square_size:
+                    neighbors.append((move, dst_row * square_size + dst_col))
+            table.append(tuple(neighbors))
+        _neighbor_tables[square_size] = tuple(table)
+    return _neighbor_tables[square_size]
+
+
+def target_table(square_size):
+    """
+    Get the target table of a board size, it is built once and cached
+    :param square_size: Chessboard size
+    :return:
+        table: tuple, table[blank][operation] is the next blank position, '-1' if the operation is invalid
+    """
+    if square_size not in _target_tables:
+        table = []
+        for neighbors in neighbor_table(square_size):
+            targets = [-1, -1, -1, -1]
+            for move, dst in neighbors:
+                targets[move] = dst
+            table.append(tuple(targets))
+        _target_tables[square_size] = tuple(table)
+    return _target_tables[square_size]
+
+
+def successors(code, blank, square_size):
+    """
+    Generate all children of a packed board
+    :param code: Packed board
+    :param blank: Flat position of the 'blank'
+    :param square_size: Chessboard size
+    :return:
+        generator of (operation, next code, next blank, moved tile)
+    """
+    bits = tile_bits(square_size)
+    for move, dst in neighbor_table(square_size)[blank]:
+        next_code, tile = swap_blank(code, bits, blank, dst)
+        yield move, next_code, dst, tile
+
+
+def move_blank(tiles, blank, move, targets):
+    """
+    Perform one operation in place on a flat list of tiles
+    :param tiles: Flat list of tiles, modified in place
+    :param blank: Flat position of the 'blank'
+    :param move: Operation (int)
+    :param targets: Target table of the board size, see target_table()
+    :return:
+        next_blank: int, 'blank' position after the operation, '-1' if the operation is invalid
+    """
+    if not 0 <= move < 4:
+        return -1
+    dst = targets[blank][move]
+    if dst != -1:
+        tiles[blank], tiles[dst] = tiles[dst], tiles[blank]
+    return dst
@@ -0,0 +1,166 @@
+"""
+Additive (disjoint) pattern databases for the n-puzzle.
+The tiles are split into disjoint groups. For each group a table stores the minimum number of moves of
+the group's tiles needed to bring them to their goal positions, other tiles are treated as free to move.
+Moves are only counted for the tiles of one group, so the values of all groups can be added up and the
+sum is still admissible.
+Each table is built by a retrograde 0-1 BFS from 'dst_state', saved as an .npy file and memory-mapped
+when it is loaded, so it is built once per goal and shared read-only by every process using it.
+"""
+import os
+from collections import deque
+
+import numpy as np
+
+from compact_state import tile_bits, unpack_tiles
+from move_table import neighbor_table
+
+
+# Default directory of the pattern database files
+PDB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pdb')
+
+# Unreachable pattern placement
+UNREACHABLE = 255
+
+
+def default_groups(goal_tiles, square_size):
+    """
+    Split the tiles into disjoint groups of neighbouring goal positions
+    :param goal_tiles: Flat list of goal tiles, the 'blank' is 0
+    :param square_size: Chessboard size
+    :return:
+        groups: list of tuple of tiles
+    """
+    group_size = 4 if square_size <= 4 else 3
+    tiles = [tile for tile in goal_tiles if tile != 0]
+    return [tuple(tiles[i:i + group_size]) for i in range(0, len(tiles), group_size)]
+
+
+def build_pattern_table(goal_tiles, square_size, group):
+    """
+    Build the table of one group by a 0-1 BFS from the goal placement over (group positions, 'blank')
+    :param goal_tiles: Flat list of goal tiles, the 'blank' is 0
+    :param square_size: Chessboard size
+    :param group: Tiles of the group
+    :return:
+        table: uint8 numpy array of shape (square_size ** 2,) * len(group), indexed by the positions of
+        the group's tiles, UNREACHABLE for invalid placements
+    """
+    size = square_size ** 2
+    k = len(group)
+    neighbors = neighbor_table(square_size)
+    weights = [size ** (k - i) for i in range(k)]   # The 'blank' is the last digit
+
+    start = tuple(goal_tiles.index(tile) for tile in group)
+    start_blank = goal_tiles.index(0)
+    dist = bytearray([UNREACHABLE]) * (size ** (k + 1))
+
+    start_index = sum(p * w for p, w in zip(start, weights)) + start_blank
+    dist[start_index] = 0
+    queue = deque([(start, start_blank, start_index, 0)])
+
+    while queue:
+        positions, blank, index, d = queue.popleft()
+        if dist[index] < d:  # Stale entry
+            continue
+
+        base = index - blank
+        for _, dst in neighbors[blank]:
+            if dst in positions:
+                # A group tile moves into the 'blank', it costs one move
+                i = positions.index(dst)
+                next_positions = positions[:i] + (blank,) + positions[i + 1:]
+                next_index = base + (blank - dst) * weights[i] + dst
+                next_d = d + 1
+                if dist[next_index] > next_d:
+                    dist[next_index] = next_d
+                    queue.append((next_positions, dst, next_index, next_d))
+            else:
+                # Other tiles move for free
+                next_index = base + dst
+                if dist[next_index] > d:
+                    dist[next_index] = d
+                    queue.appendleft((positions, dst, next_index, d))
+
+    table = np.frombuffer(bytes(dist), dtype=np.uint8).reshape((size,) * k + (size,))
+    return table.min(axis=-1)
+
+
+class PatternDatabase(object):
+    """
+    Additive pattern database heuristic of one destination state, same interface as heuristics.Heuristic
+    Attr:
+        square_size: Chessboard size
+        groups: Disjoint groups of tiles
+        tables: Memory-mapped table of each group, see build_pattern_table()
+        tile_group: tile_group[tile] is (group index, digit weight) of 'tile', None for the 'blank'
+    """
+    def __init__(self, dst_code, square_size, groups=None, pdb_dir=None):
+        self.square_size = square_size
+        self.bits = tile_bits(square_size)
+        self.mask = (1 << self.bits) - 1
+
+        goal_tiles = unpack_tiles(dst_code, square_size)
+        self.groups = groups if groups is not None else default_groups(goal_tiles, square_size)
+        pdb_dir = pdb_dir if pdb_dir is not None else PDB_DIR
+
+        size = square_size ** 2
+        self.tables = []
+        self.tile_group = [None] * (max(goal_tiles) + 1)
+        for group_idx, group in enumerate(self.groups):
+            path = os.path.join(pdb_dir, '{0}x{0}_{1:x}_{2}.npy'.format(
+                square_size, dst_code, '-'.join(str(tile) for tile in group)))
+            if not os.path.exists(path):
+                save_table(path, build_pattern_table(goal_tiles, square_size, group))
+            self.tables.append(np.load(path, mmap_mode='r').ravel())
+            for i, tile in enumerate(group):
+                self.tile_group[tile] = (group_idx, size ** (len(group) - 1 - i))
+
+    def group_indices(self, code):
+        """
+        Table index of every group for a packed board
+        """
+        indices = [0] * len(self.groups)
+        for pos in range(self.square_size ** 2):
+            entry = self.tile_group[(code >> (pos * self.bits)) & self.mask]
+            if entry is not None:
+                indices[entry[0]] += pos * entry[1]
+        return indices
+
+    def evaluate(self, code):
+        """
+        Evaluate a packed board from scratch
+        :param code: Packed board
+        :return: h
+        """
+        return sum(int(table[index]) for table, index in zip(self.tables, self.group_indices(code)))
+
+    def update(self, parent_h, code, tile, src, dst):
+        """
+        Get the h of a child from its parent, only the group of the moved tile changes, see
+        heuristics.Heuristic.update()
+        """
+        if self.tile_group[tile] is None:
+            return parent_h
+
+        group_idx, weight = self.tile_group[tile]
+        index = 0
+        for pos in range(self.square_size ** 2):
+            entry = self.tile_group[(code >> (pos * self.bits)) & self.mask]
+            if entry is not None and entry[0] == group_idx:
+                index += pos * entry[1]
+        table = self.tables[group_idx]
+        return parent_h - int(table[index + (src - dst) * weight]) + int(table[index])
+
+
+def save_table(path, table):
+    """
+    Save a table atomically, so concurrent readers never see a partial file
+    :param path: .npy file path
+    :param table: numpy array
+    :return:
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = '{}.{}.tmp.npy'.format(path[:-len('.npy')], os.getpid())
+    np.save(tmp_path, table)
+    os.replace(tmp_path, path)
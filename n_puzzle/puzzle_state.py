@@ -1,6 +1,14 @@
 import numpy as np
 from enum import Enum
 import copy
+import heapq
+import itertools
+import time
+
+from compact_state import CompactState, pack_board, pack_tiles, unpack_board, tile_bits
+from heuristics import ADMISSIBLE_HEURISTICS, get_heuristic
+from move_table import successors, target_table, move_blank, neighbor_table, INVERSE_MOVE
+from search_stats import SearchStats
 
 
 # Enum of operation in EightPuzzle problem
@@ -84,10 +92,34 @@ class PuzzleState(object):
 
     def clone(self):
         """
-        Return the state's deepcopy
+        Return a copy of the state. The board is copied, 'pre_state' is shared with the original
+        instead of copying the whole ancestor chain
+        :return:
+        """
+        new_state = copy.copy(self)
+        new_state.state = self.state.copy()
+        return new_state
+
+    def to_code(self):
+        """
+        Pack the board into an int, see compact_state.py
+        :return:
+            code: int, packed board
+        """
+        return pack_board(self.state)
+
+    @classmethod
+    def from_code(cls, code, square_size):
+        """
+        Build a state view of a packed board
+        :param code: Packed board
+        :param square_size: Chessboard size
         :return:
+            state: PuzzleState
         """
-        return copy.deepcopy(self)
+        state = cls(square_size=square_size)
+        state.state = unpack_board(code, square_size)
+        return state
 
     def generate_state(self, random=False, seed=None):
         """
@@ -120,6 +152,21 @@ class PuzzleState(object):
         print("----------------------\n")
 
 
+def move_index(move):
+    """
+    Convert an operation into its int value
+    :param move: Move or int
+    :return:
+        index: int, '-1' indicates an invalid operation
+    """
+    if isinstance(move, Move):
+        return move.value
+    try:
+        return Move(move).value
+    except ValueError:
+        return -1
+
+
 def check_move(curr_state, move):
     """
     Check the operation 'move' can be performed on current state 'curr_state'
@@ -133,33 +180,19 @@ def check_move(curr_state, move):
         dst_col: int, future blank col index after move
     """
     # assert isinstance(move, Move)  # Check operation type
-    assert curr_state.is_valid()
-
     if not isinstance(move, Move):
         move = Move(move)
 
     src_row, src_col = curr_state.blank_pos()
-    dst_row, dst_col = src_row, src_col
-    valid_op = False
-
-    if move == Move.Up:  # Number moves up, blank moves down
-        dst_row -= 1
-    elif move == Move.Down:
-        dst_row += 1
-    elif move == Move.Left:
-        dst_col -= 1
-    elif move == Move.Right:
-        dst_col += 1
-    else:  # Invalid operation
-        dst_row = -1
-        dst_col = -1
-
-    if dst_row < 0 or dst_row > curr_state.state.shape[0] - 1 or dst_col < 0 or dst_col > curr_state.state.shape[1] - 1:
-        valid_op = False
-    else:
-        valid_op = True
+    assert src_row != -1 and src_col != -1  # Valid state has only one 'blank'
 
-    return valid_op, src_row, src_col, dst_row, dst_col
+    square_size = curr_state.state.shape[0]
+    dst = target_table(square_size)[src_row * square_size + src_col][move.value]
+    if dst == -1:  # Invalid operation
+        return False, src_row, src_col, -1, -1
+
+    dst_row, dst_col = divmod(dst, square_size)
+    return True, src_row, src_col, dst_row, dst_col
 
 
 def once_move(curr_state, move):
@@ -196,6 +229,18 @@ def check_state(src_state, dst_state):
     return (src_state.state == dst_state.state).all()
 
 
+def flat_tiles(curr_state):
+    """
+    Get the flat tile list and the 'blank' position of a state, used to replay moves in place
+    :param curr_state: Puzzle state
+    :return:
+        tiles: list of int
+        blank: int, flat 'blank' position
+    """
+    tiles = curr_state.state.ravel().tolist()
+    return tiles, tiles.index(-1)
+
+
 def run_moves(curr_state, dst_state, moves):
     """
     Perform list of move to current state, and check the final state is same as destination state or not
@@ -206,18 +251,16 @@ def run_moves(curr_state, dst_state, moves):
     :return:
         flag of moves: True - We can get 'dst_state' from 'curr_state' by 'moves'
     """
-    pre_state = curr_state.clone()
-    next_state = curr_state.clone()
+    tiles, blank = flat_tiles(curr_state)
+    targets = target_table(curr_state.square_size)
 
     for move in moves:
-        valid_move, next_state = once_move(pre_state, move)
+        blank = move_blank(tiles, blank, move_index(move), targets)
 
-        if not valid_move:
+        if blank == -1:
             return False
 
-        pre_state = next_state.clone()
-
-    if check_state(next_state, dst_state):
+    if tiles == dst_state.state.ravel().tolist():
         return True
     else:
         return False
@@ -231,12 +274,16 @@ def runs(curr_state, moves):
     :param moves:
     :return:
     """
-    pre_state = curr_state.clone()
-    next_state = curr_state.clone()
+    tiles, blank = flat_tiles(curr_state)
+    targets = target_table(curr_state.square_size)
 
     for move in moves:
-        valid_move, next_state = once_move(pre_state, move)
-        pre_state = next_state.clone()
+        next_blank = move_blank(tiles, blank, move_index(move), targets)
+        if next_blank != -1:
+            blank = next_blank
+
+    next_state = curr_state.clone()
+    next_state.state = np.asarray(tiles, dtype=curr_state.state.dtype).reshape(curr_state.state.shape)
     return next_state
 
 
@@ -250,30 +297,33 @@ def print_moves(init_state, moves):
     print("Initial state")
     init_state.display()
 
-    pre_state = init_state.clone()
+    tiles, blank = flat_tiles(init_state)
+    targets = target_table(init_state.square_size)
     next_state = init_state.clone()
 
     for idx, move in enumerate(moves):
-        if move == Move.Up:  # Number moves up, blank moves down
+        move_id = move_index(move)
+        if move_id == Move.Up.value:  # Number moves up, blank moves down
             print("{} th move. Goes up.".format(idx))
-        elif move == Move.Down:
+        elif move_id == Move.Down.value:
             print("{} th move. Goes down.".format(idx))
-        elif move == Move.Left:
+        elif move_id == Move.Left.value:
             print("{} th move. Goes left.".format(idx))
-        elif move == Move.Right:
+        elif move_id == Move.Right.value:
             print("{} th move. Goes right.".format(idx))
         else:  # Invalid operation
             print("{} th move. Invalid move: {}".format(idx, move))
 
-        valid_move, next_state = once_move(pre_state, move)
+        next_blank = move_blank(tiles, blank, move_id, targets)
 
-        if not valid_move:
+        if next_blank == -1:
             print("Invalid move: {}, ignore".format(move))
+        else:
+            blank = next_blank
 
+        next_state.state = np.asarray(tiles, dtype=init_state.state.dtype).reshape(init_state.state.shape)
         next_state.display()
 
-        pre_state = next_state.clone()
-
     print("We get final state: ")
     next_state.display()
 
@@ -314,6 +364,73 @@ def convert_moves(moves):
         return moves
 
 
+def is_solvable(init_state, dst_state):
+    """
+    Check 'dst_state' can be reached from 'init_state', works for odd and even board widths.
+    Every move swaps the 'blank' with a neighbour, it changes the parity of the tile permutation and the
+    parity of the 'blank' Manhattan distance together. So the instance is solvable if and only if the
+    permutation which maps init_state onto dst_state (counted with the 'blank') has the same parity as
+    the Manhattan distance between the two 'blank' positions
+    :param init_state: Initial puzzle state
+    :param dst_state: Destination puzzle state
+    :return:
+        flag: boolean, True - solvable, False - unsolvable
+    """
+    init_tiles = init_state.state.ravel().tolist()
+    dst_tiles = dst_state.state.ravel().tolist()
+    if init_state.state.shape != dst_state.state.shape or sorted(init_tiles) != sorted(dst_tiles):
+        return False
+    if len(set(init_tiles)) != len(init_tiles) or init_tiles.count(-1) != 1:
+        return False
+
+    # Parity of the permutation from its cycles, O(n)
+    dst_pos = {tile: pos for pos, tile in enumerate(dst_tiles)}
+    perm = [dst_pos[tile] for tile in init_tiles]
+    visited = [False] * len(perm)
+    cycles = 0
+    for pos in range(len(perm)):
+        if not visited[pos]:
+            cycles += 1
+            while not visited[pos]:
+                visited[pos] = True
+                pos = perm[pos]
+    perm_parity = (len(perm) - cycles) % 2
+
+    square_size = init_state.state.shape[0]
+    init_row, init_col = divmod(init_tiles.index(-1), square_size)
+    dst_row, dst_col = divmod(dst_tiles.index(-1), square_size)
+    blank_parity = (abs(init_row - dst_row) + abs(init_col - dst_col)) % 2
+
+    return perm_parity == blank_parity
+
+
+def generate_solvable_state(square_size=3, dst_state=None, seed=None):
+    """
+    Generate a random state which can reach 'dst_state'
+    The whole board is shuffled, if the result is unsolvable two tiles are swapped, which flips the
+    permutation parity and keeps the 'blank' in place
+    :param square_size: Chessboard size
+    :param dst_state: Destination puzzle state, the normal state is used if it is None
+    :param seed: Choose the seed of random
+    :return:
+        state: PuzzleState
+    """
+    if dst_state is None:
+        dst_state = PuzzleState(square_size=square_size)
+
+    rng = np.random.RandomState(seed)
+    state = PuzzleState(square_size=square_size)
+    state.state = rng.permutation(dst_state.state.ravel()).reshape(square_size, square_size)
+
+    if not is_solvable(state, dst_state):
+        tiles = state.state.ravel()
+        first, second = np.flatnonzero(tiles != -1)[:2]
+        tiles[first], tiles[second] = tiles[second], tiles[first]
+        state.state = tiles.reshape(square_size, square_size)
+
+    return state
+
+
 """
 NOTICE:
 1. init_state is a 3x3 numpy array, the "space" is indicated as -1, for example
@@ -336,186 +453,605 @@ NOTICE:
    
 3. It's just a simple example of A-Star search. You can implement this function in your own design.  
 """
-def astar_search_for_puzzle_problem(init_state, dst_state, heuristics='hamming'):
+def astar_search_for_puzzle_problem(init_state, dst_state, heuristics='hamming', max_nodes=None, time_limit=None,
+                                    stats=None, progress_callback=None, progress_interval=1000, cache=None,
+                                    weight=1.0, pdb_dir=None):
     """
     Use AStar-search to find the path from init_state to dst_state
     :param init_state:  Initial puzzle state
     :param dst_state:   Destination puzzle state
     :param heuristics:  Heuristic function
+    :param max_nodes:   Maximum number of expanded nodes, None - no limit
+    :param time_limit:  Maximum search time in seconds, None - no limit
+    :param stats:       SearchStats to fill while searching, None - no statistics
+    :param progress_callback:  Function called with the SearchStats every 'progress_interval' expansions
+    :param progress_interval:  Number of expansions between two progress callbacks
+    :param cache:       SolutionCache, see solution_cache.py. Cached solutions are returned directly, states with a
+                        cached exact distance use it as h and end the search when expanded. Solutions found with
+                        an admissible heuristic are stored. None - no cache
+    :param weight:      Weight w of the heuristic, f = g + w * h. w > 1 expands fewer nodes, the solution is at most
+                        w times longer than the shortest one for a consistent heuristic. w = 1 is plain A*
+    :param pdb_dir:     Directory of the pattern database files, only used when heuristics = 'pdb'
     :return:  All operations needed to be performed from init_state to dst_state
         moves: list of Move. e.g: move_list = [Move.Up, Move.Left, Move.Right, Move.Up]
+        None if the instance is unsolvable or a limit is reached
     """
 
     # Auxiliary functions
-    def find_front_node(open_list):
+    def finish(move_list, store=False):
+        '''
+        Record the final statistics and return the result, a searched solution is stored in the cache
         '''
-        Find best front node by g & h
+        if store and cache is not None and heuristics in ADMISSIBLE_HEURISTICS and weight == 1:
+            cache.put_solution(square_size, start_state.code, dst_code, move_list)
+        if stats is not None:
+            stats.elapsed = time.perf_counter() - search_start
+            stats.solution_depth = len(move_list) if move_list is not None else None
+        return move_list
+
+    def push_node(open_heap, node_index):
         '''
-        min_cost = open_list[0].h + open_list[0].g
-        curr_state = open_list[0]
-        curr_idx = 0
-        
-        for i in range(len(open_list)):
-            if open_list[i].h + open_list[i].g < min_cost:
-                min_cost = open_list[i].h + open_list[i].g
-                curr_state = open_list[i]
-                curr_idx = i
-                
-        return curr_idx, curr_state
-
-
-    def state_in_list(state, state_list):
-        in_list = False
-        match_state = None
-        
-        for each in state_list:
-            if each == state:
-                in_list = True
-                match_state = each
-                break
-
-        return in_list, match_state
-
-    def get_path(curr_state):
+        Push node into open_heap. Ties on f are broken by smaller h (deeper node) first,
+        then by insertion order, so the search is deterministic. A cached exact distance replaces h
+        '''
+        state = nodes[node_index]
+        h = state.h
+        if exact:
+            entry = exact.get(state.code)
+            if entry is not None:
+                h = entry[0]
+        heapq.heappush(open_heap, (state.g + weight * h, h, next(counter), node_index))
+
+    def get_path(node_index):
         # Initiate an empty move list
         moves = []
 
-        # Fill in path recursively
-        if curr_state.pre_move == None:
-            return moves
-        else:
-            moves.append(curr_state.pre_move)
-            moves += get_path(curr_state.pre_state)
+        # Follow parent indices back to the root
+        while nodes[node_index].parent != -1:
+            moves.append(nodes[node_index].move)
+            node_index = nodes[node_index].parent
 
         return moves
 
-    def expand_state(curr_state):
-        moves = [0, 1, 2, 3]
+    def expand_state(curr_index):
+        curr_state = nodes[curr_index]
         childs = []
 
-        # One-step moving
-        for each in moves:
-            valid_op, next_state = once_move(curr_state, each)
-            if valid_op:
-                childs.append(next_state)
-        
+        # One-step moving with the precomputed move table
+        for move, code, blank, tile in successors(curr_state.code, curr_state.blank, square_size):
+            childs.append((CompactState(code, blank, curr_state.g, curr_state.h, curr_index, move), tile))
+
         return childs
 
-    def update_cost(child_state, dst_state, metric):
+    def update_cost(child_state, parent_state, tile):
         '''
         Update child_state.h and child_state.g
+        The child is its parent with 'tile' moved into the parent's 'blank', so h is updated incrementally
+        from the parent's h, see heuristics.py for the metrics
         '''
-        # Initialization
-        child_state.h = 0
-
-        # Euclidean distance
-        if metric == 'euclidean':
-            curr_vec = np.reshape(child_state.state, (-1, 1))
-            dst_vec = np.reshape(dst_state.state, (-1, 1))
-            child_state.h = np.linalg.norm(curr_vec-dst_vec)
-
-        # Blank position metric
-        elif metric == 'blank_pos':
-            dst_pos = np.argwhere(dst_state.state==-1)
-            curr_pos = np.argwhere(child_state.state==-1)
-            child_state.h = np.linalg.norm(dst_pos-curr_pos, ord=1)
-            
-        # Chebyshev distance
-        elif metric == 'chebyshev':
-            dst_pos = np.argwhere(dst_state.state==-1)
-            curr_pos = np.argwhere(child_state.state==-1)
-            child_state.h = np.linalg.norm(dst_pos-curr_pos, ord=np.inf)
-
-        # The sum of distances of the tiles from their goal positions
-        elif metric == 'manhattan':
-            for i in range(dst_state.square_size-1):
-                dst_pos = np.argwhere(dst_state.state==(i+1))
-                curr_pos = np.argwhere(child_state.state==(i+1))
-                child_state.h += np.linalg.norm(dst_pos-curr_pos, ord=1)
-
-        # Hamming
-        elif metric == 'hamming':
-            curr_vec = np.reshape(child_state.state, (1, -1))[0]
-            dst_vec = np.reshape(dst_state.state, (1, -1))[0]
-            
-            for each in curr_vec:
-                index = np.argwhere(curr_vec==each)
-                if dst_vec[index] != each and each != -1:
-                    child_state.h += 1
-
-        # Mixed
-        elif metric == 'mix':
-            h1 = 0
-            h2 = 0
-
-            # Manhattan
-            for i in range(dst_state.square_size-1):
-                dst_pos = np.argwhere(dst_state.state==(i+1))
-                curr_pos = np.argwhere(child_state.state==(i+1))
-                h1 += np.linalg.norm(dst_pos-curr_pos, ord=1)
-            
-            
-
-            # Hamming
-            curr_vec = np.reshape(child_state.state, (1, -1))[0]
-            dst_vec = np.reshape(dst_state.state, (1, -1))[0]
-            
-            for each in curr_vec:
-                index = np.argwhere(curr_vec==each)
-                if dst_vec[index] != each and each != -1:
-                    h2 += 1
-
-            child_state.h += 0.5*h1 + 0.5*h2
+        child_state.h = heuristic.update(parent_state.h, child_state.code, tile, child_state.blank, parent_state.blank)
 
         # Update child state properties
-        child_state.g += 1
-        
-        return child_state
+        child_state.g = parent_state.g + 1
 
-    start_state = init_state.clone()
-    end_state = dst_state.clone()
+        return child_state
 
-    open_list = []   # You can also use priority queue instead of list
-    close_list = []
+    if weight < 1:
+        raise ValueError('weight should be at least 1, get {}'.format(weight))
+    if stats is None and progress_callback is not None:
+        stats = SearchStats()
+    timed = stats is not None
+    clock = time.perf_counter
+    search_start = clock()
+
+    # Unsolvable instances would exhaust half of the state space
+    if not is_solvable(init_state, dst_state):
+        return finish(None)
+
+    square_size = init_state.square_size
+    start_row, start_col = init_state.blank_pos()
+    start_state = CompactState(init_state.to_code(), int(start_row * square_size + start_col))
+    dst_code = dst_state.to_code()
+
+    if cache is not None:
+        move_list = cache.get_solution(square_size, start_state.code, dst_code)
+        if move_list is not None:
+            return finish(move_list)
+
+    heuristic = get_heuristic(heuristics, dst_state, pdb_dir=pdb_dir)
+    start_state.h = heuristic.evaluate(start_state.code)
+
+    nodes = [start_state]   # Node table, parents are referenced by index
+    counter = itertools.count()
+    open_heap = []      # Binary heap of (f, h, counter, node index)
+    open_index = {}     # Frontier index: packed board -> best g pushed so far
+    close_set = set()   # Packed boards of expanded states
+    # Packed board -> (exact distance, next move) of cached states, a snapshot shared by the searches of this goal
+    # so the database stays out of the search loop. Read only, h itself is kept for the incremental updates
+    exact = cache.load_distances(square_size, dst_code) if cache is not None else {}
 
     move_list = []  # The operations from init_state to dst_state
 
     # Initial A-star
-    open_list.append(start_state)
-
-    while len(open_list) > 0:
-        # Get best node from open_list
-        curr_idx, curr_state = find_front_node(open_list)
-
-        # Delete best node from open_list
-        open_list.pop(curr_idx)
-
-        # Add best node in close_list
-        close_list.append(curr_state)
+    push_node(open_heap, 0)
+    open_index[start_state.code] = start_state.g
+
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+    expanded = 0
+
+    while len(open_heap) > 0:
+        # Get best node from open_heap
+        if timed:
+            tic = clock()
+        _, _, _, curr_index = heapq.heappop(open_heap)
+        curr_state = nodes[curr_index]
+        if timed:
+            stats.queue_time += clock() - tic
+
+        # Lazy deletion: skip entries superseded by a cheaper path or already expanded
+        if curr_state.code in close_set or open_index.get(curr_state.code) != curr_state.g:
+            continue
+
+        # Stop when the node budget or the time budget runs out
+        if max_nodes is not None and expanded >= max_nodes:
+            return finish(None)
+        if deadline is not None and time.perf_counter() > deadline:
+            return finish(None)
+        expanded += 1
+
+        # Add best node in close_set
+        del open_index[curr_state.code]
+        close_set.add(curr_state.code)
+
+        if timed:
+            stats.nodes_expanded = expanded
+            stats.peak_closed = max(stats.peak_closed, len(close_set))
+            if progress_callback is not None and expanded % progress_interval == 0:
+                progress_callback(stats)
 
         # Check whether found solution
-        if curr_state == dst_state:
-            move_list = get_path(curr_state)
+        if curr_state.code == dst_code:
+            move_list = get_path(curr_index)
             # Arrange move order
             move_list.reverse()
-            return move_list    # 'moves' is a move_list of int
+            return finish(move_list, store=True)    # 'moves' is a move_list of int
+
+        # A cached state popped with its exact distance is on an optimal path, the cache has the rest of it
+        if curr_state.code in exact:
+            suffix = cache.follow(square_size, curr_state.code, dst_code)
+            if suffix is not None:
+                move_list = get_path(curr_index)
+                move_list.reverse()
+                return finish(move_list + suffix, store=True)
 
         # Expand node
-        childs = expand_state(curr_state)
+        if timed:
+            tic = clock()
+        childs = expand_state(curr_index)
+        if timed:
+            stats.expansion_time += clock() - tic
+            stats.nodes_generated += len(childs)
 
-        for child_state in childs:
+        for child_state, tile in childs:
 
             # Explored node
-            in_list, match_state = state_in_list(child_state, close_list)
-            if in_list:
+            if child_state.code in close_set:
+                if timed:
+                    stats.duplicates_dropped += 1
                 continue
 
             # Assign cost to child state. You can also do this in Expand operation
-            child_state = update_cost(child_state, dst_state, heuristics)
+            if timed:
+                tic = clock()
+            child_state = update_cost(child_state, curr_state, tile)
+            if timed:
+                stats.heuristic_time += clock() - tic
+
+            # Keep only the cheapest path to a frontier state, older heap entries become stale
+            if child_state.code in open_index and open_index[child_state.code] <= child_state.g:
+                if timed:
+                    stats.duplicates_dropped += 1
+                continue
+
+            open_index[child_state.code] = child_state.g
+            nodes.append(child_state)
+            if timed:
+                tic = clock()
+            push_node(open_heap, len(nodes) - 1)
+            if timed:
+                stats.queue_time += clock() - tic
+
+        if timed:
+            stats.peak_open = max(stats.peak_open, len(open_index))
+
+    return finish(None)
+
+
+def anytime_astar_search_for_puzzle_problem(init_state, dst_state, heuristics='manhattan', weight=3.0,
+                                            weight_step=0.5, max_nodes=None, time_limit=None, stats=None,
+                                            pdb_dir=None):
+    """
+    Anytime weighted A* in the style of ARA*: a first solution is found quickly with f = g + w * h, then w is
+    lowered step by step down to 1. Each round reuses the search effort of the previous ones: the g values and
+    parents are kept, and the states whose g improved after they had been expanded (the inconsistent states)
+    are queued again instead of restarting from init_state
+    :param init_state:  Initial puzzle state
+    :param dst_state:   Destination puzzle state
+    :param heuristics:  Heuristic function, should be consistent for the bounds to hold, see heuristics.py
+    :param weight:      Initial weight w of the heuristic
+    :param weight_step: Decrease of w after every round
+    :param max_nodes:   Maximum number of expanded nodes over all rounds, None - no limit
+    :param time_limit:  Maximum search time in seconds, None - no limit
+    :param stats:       SearchStats to fill while searching (counters only), None - no statistics
+    :param pdb_dir:     Directory of the pattern database files, only used when heuristics = 'pdb'
+    :return:
+        generator of (moves, bound): every improved solution as a list of int, same format as
+        astar_search_for_puzzle_problem(), and 'bound' such that len(moves) <= bound * shortest length.
+        The last solution has bound 1.0 if the search finishes. Nothing is generated for unsolvable instances
+    """
+    if weight < 1:
+        raise ValueError('weight should be at least 1, get {}'.format(weight))
+    if weight_step <= 0:
+        raise ValueError('weight_step should be positive, get {}'.format(weight_step))
+    search_start = time.perf_counter()
+    if not is_solvable(init_state, dst_state):
+        return
+
+    square_size = init_state.square_size
+    start_row, start_col = init_state.blank_pos()
+    start_state = CompactState(init_state.to_code(), int(start_row * square_size + start_col))
+    heuristic = get_heuristic(heuristics, dst_state, pdb_dir=pdb_dir)
+    start_state.h = heuristic.evaluate(start_state.code)
+    dst_code = dst_state.to_code()
+
+    nodes = {start_state.code: start_state}     # Packed board -> node, 'parent' is the parent's packed board
+    counter = itertools.count()
+    open_heap = []      # Binary heap of (f, h, counter, packed board, g)
+    open_set = {start_state.code}
+    close_set = set()
+    incons = set()      # Expanded states whose g improved in this round
+
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+    expanded = 0
+
+    def push_node(code):
+        state = nodes[code]
+        heapq.heappush(open_heap, (state.g + weight * state.h, state.h, next(counter), code, state.g))
+
+    def get_path(code):
+        moves = []
+        while nodes[code].parent != -1:
+            moves.append(nodes[code].move)
+            code = nodes[code].parent
+        moves.reverse()
+        return moves
+
+    def goal_g():
+        goal = nodes.get(dst_code)
+        return goal.g if goal is not None else float('inf')
+
+    def improve_path():
+        '''
+        Expand states until no queued f is below the g of the goal, return False if a limit is reached
+        '''
+        nonlocal expanded
+        while open_heap:
+            f, _, _, code, g = open_heap[0]
+            if goal_g() <= f:
+                return True
+            heapq.heappop(open_heap)
+            # Lazy deletion: skip entries superseded by a cheaper path or already expanded in this round
+            if code not in open_set or nodes[code].g != g:
+                continue
+
+            # Stop when the node budget or the time budget runs out
+            if max_nodes is not None and expanded >= max_nodes:
+                return False
+            if deadline is not None and time.perf_counter() > deadline:
+                return False
+            expanded += 1
+
+            open_set.discard(code)
+            close_set.add(code)
+            curr_state = nodes[code]
+            for move, child_code, blank, tile in successors(code, curr_state.blank, square_size):
+                if stats is not None:
+                    stats.nodes_generated += 1
+                child_state = nodes.get(child_code)
+                if child_state is None:
+                    h = heuristic.update(curr_state.h, child_code, tile, blank, curr_state.blank)
+                    child_state = nodes[child_code] = CompactState(child_code, blank, float('inf'), h)
+                if curr_state.g + 1 >= child_state.g:
+                    continue
+                child_state.g = curr_state.g + 1
+                child_state.parent = code
+                child_state.move = move
+                if child_code in close_set:
+                    incons.add(child_code)
+                else:
+                    open_set.add(child_code)
+                    push_node(child_code)
+
+            if stats is not None:
+                stats.nodes_expanded = expanded
+                stats.peak_open = max(stats.peak_open, len(open_set))
+                stats.peak_closed = max(stats.peak_closed, len(nodes))
+        return True
+
+    push_node(start_state.code)
+    best_cost, best_bound = float('inf'), float('inf')
+    while True:
+        # The bound only holds once a round has finished
+        if not improve_path():
+            break
+        cost = goal_g()
+        if cost < float('inf'):
+            # g + h of every queued or inconsistent state is a lower bound of the shortest length
+            lower = min([nodes[code].g + nodes[code].h for code in open_set | incons] + [cost])
+            bound = min(weight, cost / lower) if lower > 0 else 1.0
+            if cost < best_cost or bound < best_bound:
+                best_cost, best_bound = cost, bound
+                moves = get_path(dst_code)
+                if stats is not None:
+                    stats.elapsed = time.perf_counter() - search_start
+                    stats.solution_depth = len(moves)
+                yield moves, bound
+        if weight == 1 or best_bound <= 1:
+            break
+
+        # Next round: lower the weight, requeue the inconsistent states and expand again
+        weight = max(1.0, weight - weight_step)
+        open_set |= incons
+        incons.clear()
+        close_set.clear()
+        open_heap = []
+        for code in open_set:
+            push_node(code)
+
+    if stats is not None:
+        stats.elapsed = time.perf_counter() - search_start
+
+
+def ida_star_search_for_puzzle_problem(init_state, dst_state, heuristics='manhattan', max_nodes=None,
+                                       time_limit=None, stats=None, progress_callback=None, progress_interval=1000,
+                                       pdb_dir=None):
+    """
+    Use IDA*-search (iterative deepening A*) to find the path from init_state to dst_state
+    Only one mutable board is kept, moves are made and unmade in place, so the memory is proportional to
+    the solution depth
+    :param init_state:  Initial puzzle state
+    :param dst_state:   Destination puzzle state
+    :param heuristics:  Heuristic function, see heuristics.py
+    :param max_nodes:   Maximum number of expanded nodes over all iterations, None - no limit
+    :param time_limit:  Maximum search time in seconds, None - no limit
+    :param stats:       SearchStats to fill while searching (counters only), None - no statistics
+    :param progress_callback:  Function called with the SearchStats every 'progress_interval' expansions
+    :param progress_interval:  Number of expansions between two progress callbacks
+    :param pdb_dir:     Directory of the pattern database files, only used when heuristics = 'pdb'
+    :return:  All operations needed to be performed from init_state to dst_state
+        moves: list of int, same format as astar_search_for_puzzle_problem()
+        None if the instance is unsolvable or a limit is reached
+    """
+    if stats is None and progress_callback is not None:
+        stats = SearchStats()
+    search_start = time.perf_counter()
 
-            # Find a better state in open_list
-            in_list, match_state = state_in_list(child_state, open_list)
-            if in_list:
+    def finish(move_list):
+        '''
+        Record the final statistics and return the result
+        '''
+        if stats is not None:
+            stats.nodes_expanded = expanded
+            stats.elapsed = time.perf_counter() - search_start
+            stats.solution_depth = len(move_list) if move_list is not None else None
+        return move_list
+
+    # IDA* would never terminate on unsolvable instances
+    expanded = 0
+    if not is_solvable(init_state, dst_state):
+        return finish(None)
+
+    square_size = init_state.square_size
+    bits = tile_bits(square_size)
+    neighbors = neighbor_table(square_size)
+    heuristic = get_heuristic(heuristics, dst_state, pdb_dir=pdb_dir)
+    dst_code = dst_state.to_code()
+
+    board = [tile if tile > 0 else 0 for tile in init_state.state.ravel().tolist()]  # The mutable board
+    move_list = []  # The operations performed on the board so far
+    found = -1
+    stopped = -2
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+
+    def search(code, blank, g, h, bound, pre_move):
+        '''
+        Depth-first search below 'bound', return 'found', 'stopped' or the smallest f which exceeds 'bound'
+        '''
+        nonlocal expanded
+
+        f = g + h
+        if f > bound:
+            return f
+        if code == dst_code:
+            return found
+
+        # Stop when the node budget or the time budget runs out
+        if max_nodes is not None and expanded >= max_nodes:
+            return stopped
+        if deadline is not None and time.perf_counter() > deadline:
+            return stopped
+        expanded += 1
+        if stats is not None:
+            stats.nodes_expanded = expanded
+            stats.nodes_generated += len(neighbors[blank]) - (pre_move is not None)
+            stats.peak_open = max(stats.peak_open, g + 1)  # Search stack depth
+            if progress_callback is not None and expanded % progress_interval == 0:
+                progress_callback(stats)
+
+        min_cost = float('inf')
+        for move, dst in neighbors[blank]:
+            # Never undo the previous move
+            if pre_move is not None and move == INVERSE_MOVE[pre_move]:
                 continue
 
-            open_list.append(child_state)  
+            # Make move: the tile on 'dst' goes to the 'blank'
+            tile = board[dst]
+            board[blank] = tile
+            board[dst] = 0
+            next_code = code - (tile << (dst * bits)) + (tile << (blank * bits))
+            move_list.append(move)
+
+            cost = search(next_code, dst, g + 1, heuristic.update(h, next_code, tile, dst, blank), bound, move)
+            if cost == found or cost == stopped:
+                return cost
+
+            # Unmake move
+            move_list.pop()
+            board[dst] = tile
+            board[blank] = 0
+            min_cost = min(min_cost, cost)
+
+        return min_cost
+
+    code = pack_tiles(board, square_size)
+    blank = board.index(0)
+    h = heuristic.evaluate(code)
+    bound = h
+
+    while True:
+        cost = search(code, blank, 0, h, bound, None)
+        if cost == found:
+            return finish(move_list)
+        if cost == stopped or cost == float('inf'):
+            return finish(None)
+        bound = cost
+
+
+def bidirectional_search_for_puzzle_problem(init_state, dst_state, max_nodes=None, time_limit=None, stats=None,
+                                            progress_callback=None, progress_interval=1000):
+    """
+    Use bidirectional BFS to find the shortest path from init_state to dst_state
+    Every move costs 1, so one BFS grows from init_state and one grows from dst_state, always expanding
+    the smaller frontier by a whole layer, until they meet
+    :param init_state:  Initial puzzle state
+    :param dst_state:   Destination puzzle state
+    :param max_nodes:   Maximum number of expanded nodes, None - no limit
+    :param time_limit:  Maximum search time in seconds, None - no limit
+    :param stats:       SearchStats to fill while searching (counters only), None - no statistics
+    :param progress_callback:  Function called with the SearchStats every 'progress_interval' expansions
+    :param progress_interval:  Number of expansions between two progress callbacks
+    :return:  All operations needed to be performed from init_state to dst_state
+        moves: list of int, same format as astar_search_for_puzzle_problem()
+        None if the instance is unsolvable or a limit is reached
+    """
+    if stats is None and progress_callback is not None:
+        stats = SearchStats()
+    search_start = time.perf_counter()
+
+    def finish(move_list):
+        '''
+        Record the final statistics and return the result
+        '''
+        if stats is not None:
+            stats.nodes_expanded = expanded
+            stats.elapsed = time.perf_counter() - search_start
+            stats.solution_depth = len(move_list) if move_list is not None else None
+        return move_list
+
+    expanded = 0
+    if not is_solvable(init_state, dst_state):
+        return finish(None)
+
+    square_size = init_state.square_size
+    init_code = init_state.to_code()
+    dst_code = dst_state.to_code()
+    if init_code == dst_code:
+        return finish([])
+
+    # packed board -> (parent packed board, move from the parent), the roots have no parent
+    forward_parent = {init_code: None}
+    backward_parent = {dst_code: None}
+    forward_depth = {init_code: 0}
+    backward_depth = {dst_code: 0}
+    forward_layer = [(init_code, flat_tiles(init_state)[1])]
+    backward_layer = [(dst_code, flat_tiles(dst_state)[1])]
+
+    deadline = time.perf_counter() + time_limit if time_limit is not None else None
+
+    while forward_layer and backward_layer:
+        # Expand the smaller frontier
+        if len(forward_layer) <= len(backward_layer):
+            layer, parent, depth, other_depth = forward_layer, forward_parent, forward_depth, backward_depth
+        else:
+            layer, parent, depth, other_depth = backward_layer, backward_parent, backward_depth, forward_depth
+
+        next_layer = []
+        meet_code, meet_cost = None, None
+        for code, blank in layer:
+            if max_nodes is not None and expanded >= max_nodes:
+                return finish(None)
+            if deadline is not None and time.perf_counter() > deadline:
+                return finish(None)
+            expanded += 1
+            if stats is not None:
+                stats.nodes_expanded = expanded
+                if progress_callback is not None and expanded % progress_interval == 0:
+                    progress_callback(stats)
+
+            for move, next_code, next_blank, _ in successors(code, blank, square_size):
+                if stats is not None:
+                    stats.nodes_generated += 1
+                if next_code in parent:
+                    if stats is not None:
+                        stats.duplicates_dropped += 1
+                    continue
+                parent[next_code] = (code, move)
+                depth[next_code] = depth[code] + 1
+                next_layer.append((next_code, next_blank))
+
+                # Finish the whole layer and keep the cheapest meeting point
+                if next_code in other_depth:
+                    cost = depth[next_code] + other_depth[next_code]
+                    if meet_cost is None or cost < meet_cost:
+                        meet_code, meet_cost = next_code, cost
+
+        if stats is not None:
+            frontier_size = len(forward_layer) + len(backward_layer) - len(layer) + len(next_layer)
+            stats.peak_open = max(stats.peak_open, frontier_size)
+            stats.peak_closed = len(forward_parent) + len(backward_parent)
+
+        if meet_code is not None:
+            return finish(join_paths(meet_code, forward_parent, backward_parent))
+
+        if layer is forward_layer:
+            forward_layer = next_layer
+        else:
+            backward_layer = next_layer
+
+    return finish(None)
+
+
+def join_paths(meet_code, forward_parent, backward_parent):
+    """
+    Build the move list of a bidirectional search through the meeting state
+    The backward search moved away from dst_state, so its half is walked from the meeting state towards
+    dst_state and every move is inverted
+    :param meet_code: Packed board where the two searches met
+    :param forward_parent: Parent map of the search from init_state
+    :param backward_parent: Parent map of the search from dst_state
+    :return:
+        moves: list of int
+    """
+    move_list = []
+    code = meet_code
+    while forward_parent[code] is not None:
+        code, move = forward_parent[code]
+        move_list.append(move)
+    move_list.reverse()
+
+    code = meet_code
+    while backward_parent[code] is not None:
+        code, move = backward_parent[code]
+        move_list.append(INVERSE_MOVE[move])
+
+    return move_list
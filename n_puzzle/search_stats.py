@@ -0,0 +1,73 @@
+"""
+Statistics of one puzzle search.
+Pass a SearchStats to a solver with 'stats=' and it is filled while the search runs, a 'progress_callback'
+receives the same object every 'progress_interval' expansions.
+"""
+
+
+class SearchStats(object):
+    """
+    Counters and timers of a search
+    Attr:
+        nodes_expanded: Number of expanded nodes
+        nodes_generated: Number of generated children
+        duplicates_dropped: Number of children dropped because the state was already expanded or queued
+            with a cheaper path
+        peak_open: Largest frontier size
+        peak_closed: Largest closed set size
+        heuristic_time: Seconds spent computing heuristic values
+        expansion_time: Seconds spent generating children
+        queue_time: Seconds spent in priority queue operations
+        elapsed: Total search seconds
+        solution_depth: Length of the returned move list, None if no solution was returned
+    """
+    def __init__(self):
+        self.nodes_expanded = 0
+        self.nodes_generated = 0
+        self.duplicates_dropped = 0
+        self.peak_open = 0
+        self.peak_closed = 0
+        self.heuristic_time = 0.0
+        self.expansion_time = 0.0
+        self.queue_time = 0.0
+        self.elapsed = 0.0
+        self.solution_depth = None
+
+    def effective_branching_factor(self, tolerance=1e-6):
+        """
+        Branching factor b* of a uniform tree of depth d = solution_depth with as many nodes as generated:
+        N + 1 = 1 + b* + b*^2 + ... + b*^d, solved by bisection
+        :param tolerance: Precision of b*
+        :return: b*, None if no solution was found
+        """
+        depth = self.solution_depth
+        if not depth:
+            return None
+
+        target = self.nodes_generated + 1
+
+        def tree_size(b):
+            return sum(b ** i for i in range(depth + 1))
+
+        low, high = 1.0, max(2.0, float(target))
+        if tree_size(low) >= target:
+            return low
+        while high - low > tolerance:
+            mid = (low + high) / 2
+            if tree_size(mid) < target:
+                low = mid
+            else:
+                high = mid
+        return (low + high) / 2
+
+    def as_dict(self):
+        """
+        Get all statistics as a dict
+        :return: dict
+        """
+        stats = dict(self.__dict__)
+        stats['effective_branching_factor'] = self.effective_branching_factor()
+        return stats
+
+    def __repr__(self):
+        return 'SearchStats({})'.format(', '.join('{}={}'.format(k, v) for k, v in self.as_dict().items()))
@@ -0,0 +1,257 @@
+"""
+Persistent cache of solved puzzle instances.
+Solutions are stored in an SQLite database keyed by the packed boards of (init_state, dst_state). For every
+optimal solution the exact remaining distance and the next move of each state on the path are stored too, a
+suffix of an optimal path is optimal, so a later search reaching any of these states knows its exact distance
+to the goal and the rest of the path.
+The database runs in WAL mode: any number of processes can read while one writes. Each process opens its own
+connection. The least recently used rows are evicted when a table grows beyond its limit, the row counts are
+tracked per connection so the tables are only counted when the limit may have been reached.
+The exact distances of a goal are read once per connection into an in-memory snapshot that every later search
+of the goal reuses. The snapshot follows this connection's writes and is dropped when another connection has
+committed (PRAGMA data_version) or rows have been evicted.
+"""
+import os
+import sqlite3
+import time
+
+from compact_state import blank_index, swap_blank, tile_bits
+from move_table import target_table
+
+
+# Default path of the cache database
+CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'solution_cache.sqlite')
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS solutions (size INTEGER, init TEXT, dst TEXT, moves TEXT, last_used REAL, '
+    'PRIMARY KEY (size, init, dst)) WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS solutions_lru ON solutions (last_used)',
+    'CREATE TABLE IF NOT EXISTS distances (size INTEGER, dst TEXT, state TEXT, distance INTEGER, '
+    'next_move INTEGER, last_used REAL, PRIMARY KEY (size, dst, state)) WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS distances_lru ON distances (last_used)',
+)
+
+
+def _key(code):
+    """
+    Text key of a packed board, packed boards of large puzzles do not fit in an SQLite integer
+    """
+    return '{:x}'.format(code)
+
+
+def apply_move(code, blank, move, square_size):
+    """
+    Apply one operation to a packed board
+    :param code: Packed board
+    :param blank: Flat position of the 'blank'
+    :param move: Operation (int)
+    :param square_size: Chessboard size
+    :return:
+        next_code, next_blank, None if the move is illegal
+    """
+    dst = target_table(square_size)[blank][move]
+    if dst < 0:
+        return None
+    next_code, _ = swap_blank(code, tile_bits(square_size), blank, dst)
+    return next_code, dst
+
+
+class SolutionCache(object):
+    """
+    Size-bounded persistent cache of solutions and exact distances
+    Attr:
+        path: Database file
+        max_solutions: Maximum number of stored solutions
+        max_states: Maximum number of stored exact distances
+    """
+    def __init__(self, path=CACHE_PATH, max_solutions=100000, max_states=1000000, timeout=30.0):
+        self.path = path
+        self.max_solutions = max_solutions
+        self.max_states = max_states
+        self.timeout = timeout
+        self._connection = None
+        self._pid = None
+        self._row_counts = {}
+        self._snapshots = {}
+        self._data_version = None
+
+    def _connect(self):
+        """
+        Connection of this process, a connection is never shared with a forked worker
+        """
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            with connection:
+                for statement in _SCHEMA:
+                    connection.execute(statement)
+            self._row_counts = {table: self._count(connection, table) for table in ('solutions', 'distances')}
+            self._snapshots = {}
+            self._data_version = None
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def close(self):
+        if self._connection is not None and self._pid == os.getpid():
+            self._connection.close()
+        self._connection = None
+
+    def get_solution(self, square_size, init_code, dst_code):
+        """
+        Look up a solved instance
+        :param square_size: Chessboard size
+        :param init_code: Packed initial board
+        :param dst_code: Packed destination board
+        :return:
+            moves: list of int, None if the instance is not cached
+        """
+        connection = self._connect()
+        key = (square_size, _key(init_code), _key(dst_code))
+        row = connection.execute('SELECT moves FROM solutions WHERE size = ? AND init = ? AND dst = ?',
+                                 key).fetchone()
+        if row is not None:
+            with connection:
+                connection.execute('UPDATE solutions SET last_used = ? WHERE size = ? AND init = ? AND dst = ?',
+                                   (time.time(),) + key)
+            return [int(move) for move in row[0]]
+
+        # Any optimal path through the initial state gives its solution
+        return self.follow(square_size, init_code, dst_code)
+
+    def get_distance(self, square_size, code, dst_code):
+        """
+        Look up the exact distance of a state, the last used time is not updated, see touch()
+        :param square_size: Chessboard size
+        :param code: Packed board
+        :param dst_code: Packed destination board
+        :return:
+            (distance, next move), None if the state is not cached
+        """
+        return self._connect().execute(
+            'SELECT distance, next_move FROM distances WHERE size = ? AND dst = ? AND state = ?',
+            (square_size, _key(dst_code), _key(code))).fetchone()
+
+    def load_distances(self, square_size, dst_code):
+        """
+        Exact distances of all cached states of one goal, so a search can look them up without touching the
+        database per node. The goal's rows are read once, later calls return the same snapshot until the cache
+        changes, which costs one PRAGMA. The last used time is not updated, see touch()
+        :param square_size: Chessboard size
+        :param dst_code: Packed destination board
+        :return:
+            dict of packed board -> (distance, next move), shared by the callers, not to be modified
+        """
+        connection = self._connect()
+        version = connection.execute('PRAGMA data_version').fetchone()[0]
+        if version != self._data_version:
+            # Another connection has committed since the snapshots were read
+            self._snapshots = {}
+            self._data_version = version
+
+        key = (square_size, dst_code)
+        if key not in self._snapshots:
+            rows = connection.execute('SELECT state, distance, next_move FROM distances WHERE size = ? AND dst = ?',
+                                      (square_size, _key(dst_code)))
+            self._snapshots[key] = {int(state, 16): (distance, next_move) for state, distance, next_move in rows}
+        return self._snapshots[key]
+
+    def touch(self, square_size, codes, dst_code):
+        """
+        Mark the exact distances of some states as recently used
+        :param square_size: Chessboard size
+        :param codes: Packed boards
+        :param dst_code: Packed destination board
+        :return:
+        """
+        now, dst = time.time(), _key(dst_code)
+        with self._connect() as connection:
+            connection.executemany('UPDATE distances SET last_used = ? WHERE size = ? AND dst = ? AND state = ?',
+                                   [(now, square_size, dst, _key(code)) for code in codes])
+
+    def follow(self, square_size, code, dst_code):
+        """
+        Rebuild an optimal path to the goal from the stored next moves
+        :param square_size: Chessboard size
+        :param code: Packed board
+        :param dst_code: Packed destination board
+        :return:
+            moves: list of int, None if the state is not cached or the path has been evicted
+        """
+        moves, path = [], []
+        blank = blank_index(code, square_size)
+        while code != dst_code:
+            entry = self.get_distance(square_size, code, dst_code)
+            if entry is None or (moves and entry[0] != distance - 1):
+                return None
+            distance, move = entry
+            path.append(code)
+            moves.append(move)
+            code, blank = apply_move(code, blank, move, square_size)
+        if path:
+            self.touch(square_size, path, dst_code)
+        return moves
+
+    def put_solution(self, square_size, init_code, dst_code, moves, optimal=True):
+        """
+        Store a solved instance
+        :param square_size: Chessboard size
+        :param init_code: Packed initial board
+        :param dst_code: Packed destination board
+        :param moves: list of int, from init_state to dst_state
+        :param optimal: True - 'moves' is a shortest solution, the exact distances of its states are stored too
+        :return:
+        """
+        now, dst = time.time(), _key(dst_code)
+        rows, exact = [], {}
+        if optimal:
+            code, blank = init_code, blank_index(init_code, square_size)
+            for index, move in enumerate(moves):
+                rows.append((square_size, dst, _key(code), len(moves) - index, move, now))
+                exact[code] = (len(moves) - index, move)
+                code, blank = apply_move(code, blank, move, square_size)
+
+        with self._connect() as connection:
+            connection.execute('INSERT OR REPLACE INTO solutions VALUES (?, ?, ?, ?, ?)',
+                               (square_size, _key(init_code), dst, ''.join(str(move) for move in moves), now))
+            connection.executemany('INSERT OR REPLACE INTO distances VALUES (?, ?, ?, ?, ?, ?)', rows)
+
+            # Replaced rows are counted as new ones, the estimates never fall below the real counts of this
+            # connection's writes, the tables are only counted again once an estimate exceeds its limit
+            self._row_counts['solutions'] += 1
+            self._row_counts['distances'] += len(rows)
+            for table, max_rows in (('solutions', self.max_solutions), ('distances', self.max_states)):
+                if self._row_counts[table] > max_rows:
+                    self._row_counts[table] = self._evict(connection, table, max_rows)
+                    if table == 'distances':
+                        self._snapshots = {}
+
+        # Writes of this connection do not change its data_version, the snapshot of the goal follows them
+        if (square_size, dst_code) in self._snapshots:
+            self._snapshots[(square_size, dst_code)].update(exact)
+
+    @staticmethod
+    def _count(connection, table):
+        return connection.execute('SELECT COUNT(*) FROM {}'.format(table)).fetchone()[0]
+
+    @classmethod
+    def _evict(cls, connection, table, max_rows):
+        """
+        Delete the least recently used rows beyond 'max_rows'
+        :return: number of rows left
+        """
+        count = cls._count(connection, table)
+        excess = count - max_rows
+        if excess > 0:
+            cursor = connection.execute('DELETE FROM {0} WHERE last_used <= (SELECT last_used FROM {0} ORDER BY '
+                                        'last_used LIMIT 1 OFFSET ?)'.format(table), (excess - 1,))
+            count -= cursor.rowcount
+        return count
+
+    def clear(self):
+        with self._connect() as connection:
+            connection.execute('DELETE FROM solutions')
+            connection.execute('DELETE FROM distances')
+        self._row_counts = {'solutions': 0, 'distances': 0}
+        self._snapshots = {}
@@ -0,0 +1,26 @@
+"""
+Failed instances of a batch are reported with their error and do not end the batch.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from batch_solver import solve_batch
+from puzzle_state import PuzzleState, generate_solvable_state
+
+
+def test_error_status_keeps_message(tmp_path):
+    goal3, goal4 = PuzzleState(square_size=3), PuzzleState(square_size=4)
+    pairs = [
+        (generate_solvable_state(3, goal3, seed=1), goal3),
+        (generate_solvable_state(4, goal4, seed=1), goal4),    # Too large for the distance oracle
+        (generate_solvable_state(3, goal3, seed=2), goal3),
+    ]
+    results = list(solve_batch(pairs, solver='oracle', heuristics=None, max_workers=1, chunksize=3,
+                               pdb_dir=str(tmp_path)))
+
+    assert [result.status for result in results] == ['solved', 'error', 'solved']
+    assert results[0].error is None and results[2].error is None
+    assert results[1].moves is None
+    assert 'ValueError' in results[1].error and 'distance oracle' in results[1].error
@@ -0,0 +1,23 @@
+"""
+Pattern databases are cached per destination state and directory.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from heuristics import get_heuristic
+from puzzle_state import PuzzleState
+
+
+def test_pdb_cache_keyed_by_directory(tmp_path):
+    dst_state = PuzzleState(square_size=3)
+    first_dir, second_dir = str(tmp_path / 'first'), str(tmp_path / 'second')
+
+    first = get_heuristic('pdb', dst_state, pdb_dir=first_dir)
+    second = get_heuristic('pdb', dst_state, pdb_dir=second_dir)
+
+    assert first is not second
+    assert first is get_heuristic('pdb', dst_state, pdb_dir=first_dir)
+    assert os.listdir(first_dir) and sorted(os.listdir(first_dir)) == sorted(os.listdir(second_dir))
+    assert get_heuristic('manhattan', dst_state) is get_heuristic('manhattan', dst_state, pdb_dir=first_dir)
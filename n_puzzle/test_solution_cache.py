@@ -0,0 +1,71 @@
+"""
+A full solution cache costs a search no more than a constant number of queries: the distances of a goal are
+read once per connection, later searches reuse the snapshot until the cache changes.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from puzzle_state import PuzzleState, astar_search_for_puzzle_problem, generate_solvable_state
+from solution_cache import SolutionCache, _key
+
+CACHED_ROWS = 200000
+
+
+def fill(cache, square_size, dst_code, count):
+    """
+    Store 'count' fake exact distances of one goal, never reached by the searches below
+    """
+    now = time.time()
+    rows = [(square_size, _key(dst_code), _key((1 << 60) + i), 99, 0, now) for i in range(count)]
+    with cache._connect() as connection:
+        connection.executemany('INSERT INTO distances VALUES (?, ?, ?, ?, ?, ?)', rows)
+    cache._row_counts['distances'] += count
+
+
+def test_search_overhead_with_many_rows(tmp_path):
+    dst_state = PuzzleState(square_size=3)
+    cache = SolutionCache(str(tmp_path / 'cache.sqlite'))
+    fill(cache, 3, dst_state.to_code(), CACHED_ROWS)
+    instances = [generate_solvable_state(3, dst_state, seed=seed) for seed in range(4)]
+
+    # The first search reads the goal's rows once
+    astar_search_for_puzzle_problem(instances[0], dst_state, heuristics='manhattan', cache=cache)
+
+    statements = []
+    cache._connect().set_trace_callback(statements.append)
+    start = time.perf_counter()
+    for init_state in instances[1:]:
+        astar_search_for_puzzle_problem(init_state, dst_state, heuristics='manhattan', cache=cache)
+    cached_time = time.perf_counter() - start
+    cache._connect().set_trace_callback(None)
+
+    start = time.perf_counter()
+    for init_state in instances[1:]:
+        astar_search_for_puzzle_problem(init_state, dst_state, heuristics='manhattan')
+    plain_time = time.perf_counter() - start
+
+    # No full read of the goal's rows and a constant number of queries per search, whatever the cache size.
+    # Storing a solution inserts one row per state of its path
+    queries = [statement for statement in statements if not statement.startswith('INSERT')]
+    assert not any('SELECT state, distance' in statement for statement in queries)
+    assert len(queries) <= 10 * (len(instances) - 1)
+    assert cached_time < plain_time * 3 + 0.1
+
+
+def test_snapshot_follows_writes(tmp_path):
+    dst_state = PuzzleState(square_size=3)
+    path = str(tmp_path / 'cache.sqlite')
+    cache, other = SolutionCache(path), SolutionCache(path)
+    init_state = generate_solvable_state(3, dst_state, seed=5)
+    dst_code = dst_state.to_code()
+
+    assert cache.load_distances(3, dst_code) == {}
+    moves = astar_search_for_puzzle_problem(init_state, dst_state, heuristics='manhattan', cache=cache)
+    assert cache.load_distances(3, dst_code)[init_state.to_code()] == (len(moves), moves[0])
+
+    # A write of another connection is seen through PRAGMA data_version
+    other.clear()
+    assert cache.load_distances(3, dst_code) == {}
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File    : batch_search.py
+
+# Vectorized depth limited minimax over many 3x3 boards at once.
+# Every move sequence of the search tree is enumerated once as a sequence of distinct cells. For a batch of boards
+# the line sums after every sequence are the line sums of the board plus a precomputed per-sequence offset (the
+# placed marks contracted against the 8 line masks), the utilities come from a lookup table of line sums, and the
+# tree is reduced level by level with min/max over the children of every sequence. The decision is the one
+# MinimaxSearch(current_state, depth=depth) makes for every board.
+
+from functools import lru_cache
+
+import numpy as np
+
+from solution_table import LINES
+
+
+# LINE_MASKS[line, cell] = 1 if the cell lies on the line, rows, columns, diagonal, anti-diagonal
+LINE_MASKS = np.zeros((8, 9), dtype=np.int64)
+for _line, _cells in enumerate(LINES):
+    LINE_MASKS[_line, list(_cells)] = 1
+
+# Score of one line by line sum + 3, same scores as window_scores(3) of mnk_board.py
+LINE_SCORES = {
+    'max': np.array([-2000, -500, 0, 0, 0, 300, 1000], dtype=np.int64),
+    'min': np.array([1000, 300, 0, 0, 0, -500, -2000], dtype=np.int64),
+}
+
+# Value of illegal sequences, never chosen by min or max
+_INF = np.iinfo(np.int64).max // 2
+
+
+@lru_cache(maxsize=None)
+def sequence_tables(plies):
+    """
+    move sequences of the search tree, level l holds all sequences of l distinct cells ordered so that the
+    children of the sequence s of level l are the 9 - l sequences s * (9 - l) ... s * (9 - l) + 8 - l of level l + 1
+    :param plies: number of levels
+    :return: list of (cells, offsets) per level 1..plies: cells (S, l) int array, offsets (S, 8) change of the line
+    sums after the sequence. Moves alternate computer(1) and human(-1), the computer first
+    """
+    levels = []
+    cells = np.zeros((1, 0), dtype=np.int64)
+    for level in range(1, plies + 1):
+        children = []
+        for prefix in cells:
+            free = [cell for cell in range(9) if cell not in prefix]
+            children.extend(list(prefix) + [cell] for cell in free)
+        cells = np.array(children, dtype=np.int64).reshape(len(children), level)
+        players = np.where(np.arange(level) % 2 == 0, 1, -1)
+        placed = np.zeros((len(cells), 9), dtype=np.int64)
+        for ply in range(level):
+            placed[np.arange(len(cells)), cells[:, ply]] = players[ply]
+        levels.append((cells, placed.dot(LINE_MASKS.T).astype(np.int8)))
+    return levels
+
+
+def _search_chunk(boards, depth):
+    """
+    best moves of a chunk of boards
+    :param boards: (n, 9) int array
+    :param depth: searching depth below the computer's move
+    :return: (n, 2) int array
+    """
+    levels = sequence_tables(min(depth + 1, 9))
+    empty = boards == 0
+    empties = empty.sum(axis=1)
+    base = boards.dot(LINE_MASKS.T).astype(np.int8)
+
+    values = None
+    for level in range(len(levels), 0, -1):
+        cells, offsets = levels[level - 1]
+        flag = 'min' if level % 2 == 1 else 'max'
+        # sums of illegal sequences (marks on occupied cells) may leave [-3, 3], they are dropped below,
+        # shifted by 3 to index the score tables
+        sums = np.clip(base[:, None, :] + offsets[None, :, :], -3, 3) + 3
+        leaf = LINE_SCORES[flag][sums].sum(axis=2)
+        if values is not None:
+            # children of every sequence, reduced for the player to move after it
+            children = values.reshape(len(boards), len(cells), -1)
+            reduced = children.min(axis=2) if flag == 'min' else children.max(axis=2)
+            at_leaf = (level == depth + 1) | (empties[:, None] == level)
+            leaf = np.where(at_leaf, leaf, reduced)
+        legal = empty[:, cells].all(axis=2)
+        # illegal sequences never win the reduction of their parent, which is a max node for min levels
+        sentinel = -_INF if flag == 'min' else _INF
+        values = np.where(legal, leaf, sentinel)
+
+    moves = np.argmax(values, axis=1)
+    moves = np.where(empties > 0, moves, -1)
+    return np.stack([np.where(moves >= 0, moves // 3, -1), np.where(moves >= 0, moves % 3, -1)], axis=1)
+
+
+def batch_minimax_search(boards, depth=3, chunk_size=64):
+    """
+    Search the next step of many boards, the computer player(1) moves in every board
+    :param boards: (N, 3, 3) array, element lies in {1, -1, 0}
+    :param depth: searching depth below the computer's move, same as MinimaxSearch
+    :param chunk_size: number of boards searched at once, memory grows with chunk_size * 9! / (8 - depth)!
+    :return: (N, 2) int array of row and column index per board, (-1, -1) for a full board
+    """
+    boards = np.asarray(boards)
+    assert boards.ndim == 3 and boards.shape[1:] == (3, 3), 'boards: expect Nx3x3 array, get {}'.format(boards.shape)
+    flat = boards.reshape(len(boards), 9).astype(np.int64)
+
+    result = np.empty((len(boards), 2), dtype=np.int64)
+    for start in range(0, len(boards), chunk_size):
+        result[start:start + chunk_size] = _search_chunk(flat[start:start + chunk_size], depth)
+    return result
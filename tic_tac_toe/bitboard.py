@@ -0,0 +1,204 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File    : bitboard.py
+
+# Bitboard backend of the tic tac toe game.
+# A position is two 9-bit masks, one for the circles(1) and one for the crosses(-1), cell (row, col) is bit
+# 3 * row + col. Moves are generated by iterating the empty bits, wins are found against the 8 line masks and
+# the utility is scored from per-line piece counts through lookup tables.
+
+import numpy as np
+
+from transposition_table import EXACT, position_key
+
+
+FULL = 0x1ff
+
+# Rows, columns and diagonals
+LINE_MASKS = (0x007, 0x038, 0x1c0, 0x049, 0x092, 0x124, 0x111, 0x054)
+
+# Line groups in the order GameJudge.check_game_status checks them: rows, columns, diagonal, anti-diagonal
+LINE_GROUPS = (LINE_MASKS[0:3], LINE_MASKS[3:6], LINE_MASKS[6:7], LINE_MASKS[7:8])
+
+# POPCOUNT[mask] is the number of set bits of a 9-bit mask
+POPCOUNT = tuple(bin(mask).count('1') for mask in range(1 << 9))
+
+# BASE3[mask] is the base-3 value of a mask with every set bit as digit 1, see transposition_table.board_code
+BASE3 = tuple(sum(3 ** cell for cell in range(9) if mask >> cell & 1) for mask in range(1 << 9))
+
+
+def _line_scores(flag):
+    """
+    score of a line by (number of circles - number of crosses) + 3, same scores as window_scores(3) of mnk_board.py
+    """
+    if flag == 'max':
+        scores = {2: 300, -2: -500, 3: 1000, -3: -2000}
+    else:
+        scores = {2: -500, -2: 300, 3: -2000, -3: 1000}
+    return tuple(scores.get(num, 0) for num in range(-3, 4))
+
+
+LINE_SCORES = {'max': _line_scores('max'), 'min': _line_scores('min')}
+
+
+def to_bitboard(current_state):
+    """
+    convert a 3x3 numpy board into bitboards
+    :param current_state: current state of the game, it's a 3x3 array
+    :return: (circle mask, cross mask)
+    """
+    flat = np.asarray(current_state).ravel()
+    bits = 1 << np.arange(9)
+    return int(bits[flat == 1].sum()), int(bits[flat == -1].sum())
+
+
+def from_bitboard(circle, cross):
+    """
+    convert bitboards into a 3x3 numpy board
+    :param circle: circle mask
+    :param cross: cross mask
+    :return: 3x3 int array
+    """
+    bits = 1 << np.arange(9)
+    flat = ((circle & bits) != 0).astype(int) - ((cross & bits) != 0).astype(int)
+    return flat.reshape(3, 3)
+
+
+def available_moves(circle, cross):
+    """
+    empty cells in row-major order
+    :param circle: circle mask
+    :param cross: cross mask
+    :return: generator of cell indices (3 * row + col)
+    """
+    free = FULL & ~(circle | cross)
+    while free:
+        low = free & -free
+        yield low.bit_length() - 1
+        free ^= low
+
+
+def has_line(mask, lines=LINE_MASKS):
+    """
+    check a player's mask completes one of the lines
+    :param mask: mask of one player
+    :param lines: line masks to check, all 8 lines by default
+    """
+    for line in lines:
+        if mask & line == line:
+            return True
+    return False
+
+
+def game_status(circle, cross):
+    """
+    game status, same as GameJudge.check_game_status, the lines are checked in the same order
+    :param circle: circle mask
+    :param cross: cross mask
+    :return: 1 for computer wins, -1 for human wins, 0 for draw, 2 in the play
+    """
+    for group in LINE_GROUPS:
+        if has_line(circle, group):
+            return 1
+        if has_line(cross, group):
+            return -1
+    if circle | cross == FULL:
+        return 0
+    return 2
+
+
+def bitboard_utility(circle, cross, flag):
+    """
+    utility of a position, equal to tic_tac_toe.utility(current_state, flag)
+    :param circle: circle mask
+    :param cross: cross mask
+    :param flag: 'max' or 'min'
+    :return: evaluation of this state
+    """
+    scores = LINE_SCORES[flag]
+    score = 0
+    for line in LINE_MASKS:
+        score += scores[POPCOUNT[circle & line] - POPCOUNT[cross & line] + 3]
+    return score
+
+
+def bitboard_key(circle, cross, player):
+    """
+    transposition table key of a position, equal to position_key(board_code(current_state), player)
+    """
+    return position_key(BASE3[circle] + 2 * BASE3[cross], player)
+
+
+def bitboard_min_value(circle, cross, depth, table=None):
+    """
+    min_value on bitboards, min_value is for human player(-1)
+    :param circle: circle mask
+    :param cross: cross mask
+    :param depth: searching depth from current state
+    :param table: transposition table, None to search without it
+    :return: minimum value of available children states
+    """
+    if depth == 0 or circle | cross == FULL:
+        return bitboard_utility(circle, cross, 'min')
+
+    if table is not None:
+        key = bitboard_key(circle, cross, -1)
+        entry = table.get(key)
+        if entry is not None and entry.depth == depth and entry.bound == EXACT:
+            return entry.value
+
+    value = None
+    for cell in available_moves(circle, cross):
+        child_value = bitboard_max_value(circle, cross | 1 << cell, depth - 1, table)
+        if value is None or child_value < value:
+            value = child_value
+
+    if table is not None:
+        table.put(key, value, depth, EXACT)
+    return value
+
+
+def bitboard_max_value(circle, cross, depth, table=None):
+    """
+    max_value on bitboards, max_value is for computer(1)
+    :param circle: circle mask
+    :param cross: cross mask
+    :param depth: searching depth from current state
+    :param table: transposition table, None to search without it
+    :return: maximum value of available children states
+    """
+    if depth == 0 or circle | cross == FULL:
+        return bitboard_utility(circle, cross, 'max')
+
+    if table is not None:
+        key = bitboard_key(circle, cross, 1)
+        entry = table.get(key)
+        if entry is not None and entry.depth == depth and entry.bound == EXACT:
+            return entry.value
+
+    value = None
+    for cell in available_moves(circle, cross):
+        child_value = bitboard_min_value(circle | 1 << cell, cross, depth - 1, table)
+        if value is None or child_value > value:
+            value = child_value
+
+    if table is not None:
+        table.put(key, value, depth, EXACT)
+    return value
+
+
+def bitboard_search(circle, cross, depth=3, table=None):
+    """
+    choose the computer's move, same decision as the numpy minimax of MinimaxSearch
+    :param circle: circle mask
+    :param cross: cross mask
+    :param depth: searching depth below the root moves
+    :param table: transposition table, None to search without it
+    :return: row and column index of the move
+    """
+    best_cell, best_value = None, None
+    for cell in available_moves(circle, cross):
+        value = bitboard_min_value(circle | 1 << cell, cross, depth, table)
+        if best_value is None or value > best_value:
+            best_cell, best_value = cell, value
+    return best_cell // 3, best_cell % 3
@@ -0,0 +1,311 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File    : mnk_board.py
+
+# m,n,k game: k in a row on a board of m rows and n columns (tic tac toe is 3,3,3, gomoku is 15,15,5).
+# MNKBoard keeps the marks of every window of k cells in a row, column or diagonal, and the utility of the
+# position for both flags. Placing or removing a mark only updates the windows through that cell, so leaves are
+# scored without rescanning the board. mnk_search() runs a depth limited alpha-beta search with iterative
+# deepening under a wall-clock budget on it.
+
+import time
+from functools import lru_cache
+
+import numpy as np
+
+
+# (row step, col step) of rows, columns, diagonals and anti-diagonals
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+
+@lru_cache(maxsize=None)
+def board_windows(rows, cols, k):
+    """
+    all windows of k cells in a line
+    :param rows: number of rows
+    :param cols: number of columns
+    :param k: length of a winning line
+    :return: tuple of windows, each a tuple of k flat cell indices. For 3x3 boards and k = 3 these are the rows,
+    the columns, the diagonal and the anti-diagonal, in that order
+    """
+    windows = []
+    for dr, dc in DIRECTIONS:
+        for r in range(rows):
+            for c in range(cols):
+                end_r, end_c = r + dr * (k - 1), c + dc * (k - 1)
+                if 0 <= end_r < rows and 0 <= end_c < cols:
+                    windows.append(tuple((r + dr * i) * cols + c + dc * i for i in range(k)))
+    return tuple(windows)
+
+
+def window_marks(circles, crosses, k):
+    """
+    index of a window by its marks, a window holding both circles and crosses can never be completed
+    :param circles: number of circles(1) in the window
+    :param crosses: number of crosses(-1) in the window
+    :param k: length of a winning line
+    :return: circles + (k + 1) * crosses, in [0, (k + 1) ** 2)
+    """
+    return circles + (k + 1) * crosses
+
+
+@lru_cache(maxsize=None)
+def window_scores(k):
+    """
+    utility of one window by its marks, indexed by window_marks(). k - 1 marks and an empty cell are a threat, k
+    marks are a win, these are the only scores for k = 3. For k > 3 a window of 1 to k - 2 marks of one player is
+    scored too, a quarter of the score of one more mark, so the search also sees lines short of a threat. Windows
+    holding both players' marks score 0
+    :param k: length of a winning line
+    :return: dict flag -> tuple of (k + 1) ** 2 scores
+    """
+    # score of a window of one player's marks by their number, for the computer's and for the opponent's marks
+    own = {k - 1: 300, k: 1000}
+    other = {k - 1: 500, k: 2000}
+    if k > 3:
+        for count in range(1, k - 1):
+            own[count] = 300 // 4 ** (k - 1 - count)
+            other[count] = 500 // 4 ** (k - 1 - count)
+
+    max_scores, min_scores = [0] * (k + 1) ** 2, [0] * (k + 1) ** 2
+    for count in range(1, k + 1):
+        circles, crosses = window_marks(count, 0, k), window_marks(0, count, k)
+        max_scores[circles], max_scores[crosses] = own.get(count, 0), -other.get(count, 0)
+        min_scores[circles], min_scores[crosses] = -other.get(count, 0), own.get(count, 0)
+    return {'max': tuple(max_scores), 'min': tuple(min_scores)}
+
+
+class MNKBoard(object):
+    """
+    Board of an m,n,k game with incremental window sums and utility
+    Attr:
+        rows, cols, k: board size and length of a winning line
+        cells: flat list of the board, element lies in {1, -1, 0}
+        marks: window_marks() of every window of board_windows(rows, cols, k)
+        cell_windows: cell_windows[cell] lists the windows through the cell
+        score_max, score_min: utility of the position with flag 'max' and 'min'
+        empty: number of empty cells
+        code: base-3 code of the board, equal to transposition_table.board_code() on 3x3 boards
+    """
+    def __init__(self, current_state, k=3):
+        current_state = np.asarray(current_state)
+        assert current_state.ndim == 2, 'current_state: expect a 2-d array, get {}'.format(current_state.shape)
+        self.rows, self.cols = current_state.shape
+        assert 2 <= k <= max(self.rows, self.cols), 'k should lie in [2, {}]'.format(max(self.rows, self.cols))
+        self.k = k
+        self.cells = [int(x) for x in current_state.ravel()]
+        self.windows = board_windows(self.rows, self.cols, k)
+        self.cell_windows = [[] for _ in self.cells]
+        for index, window in enumerate(self.windows):
+            for cell in window:
+                self.cell_windows[cell].append(index)
+        self.marks = [window_marks(sum(self.cells[cell] == 1 for cell in window),
+                                   sum(self.cells[cell] == -1 for cell in window), k) for window in self.windows]
+        # change of window_marks() by one mark of each player
+        self.steps = {1: 1, -1: k + 1}
+        scores = window_scores(k)
+        self.max_table, self.min_table = scores['max'], scores['min']
+        self.score_max = sum(self.max_table[m] for m in self.marks)
+        self.score_min = sum(self.min_table[m] for m in self.marks)
+        self.empty = self.cells.count(0)
+        self.powers = [3 ** cell for cell in range(len(self.cells))]
+        self.code = sum(power * (x % 3) for power, x in zip(self.powers, self.cells))
+
+    def utility(self, flag):
+        """
+        utility of the position, equal to tic_tac_toe.utility(current_state, flag, k)
+        """
+        return self.score_max if flag == 'max' else self.score_min
+
+    def available_moves(self):
+        """
+        empty cells in row-major order
+        :return: list of flat cell indices
+        """
+        return [cell for cell, x in enumerate(self.cells) if x == 0]
+
+    def _add(self, cell, step):
+        marks = self.marks
+        max_table, min_table = self.max_table, self.min_table
+        for index in self.cell_windows[cell]:
+            old = marks[index]
+            new = old + step
+            marks[index] = new
+            self.score_max += max_table[new] - max_table[old]
+            self.score_min += min_table[new] - min_table[old]
+
+    def make(self, cell, player):
+        """
+        put a mark on an empty cell
+        :param cell: flat cell index
+        :param player: 1(computer) or -1(you)
+        :return:
+        """
+        self.cells[cell] = player
+        self.empty -= 1
+        self.code += self.powers[cell] * (player % 3)
+        self._add(cell, self.steps[player])
+
+    def unmake(self, cell):
+        """
+        take back the mark on a cell
+        :param cell: flat cell index
+        :return:
+        """
+        player = self.cells[cell]
+        self.cells[cell] = 0
+        self.empty += 1
+        self.code -= self.powers[cell] * (player % 3)
+        self._add(cell, -self.steps[player])
+
+    def status(self):
+        """
+        game status
+        :return: 1 for computer wins, -1 for human wins, 0 for draw, 2 in the play
+        """
+        if self.k in self.marks:
+            return 1
+        if (self.k + 1) * self.k in self.marks:
+            return -1
+        return 0 if self.empty == 0 else 2
+
+    def to_array(self):
+        """
+        :return: the board as a rows x cols array
+        """
+        return np.array(self.cells, dtype=int).reshape(self.rows, self.cols)
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside mnk_search() when the time budget runs out
+    """
+    pass
+
+
+def _ordered(board, moves, player, depth):
+    """
+    moves of an inner node, the ones with the best static value (utility with flag 'max') for the player to move
+    first, leaves are not ordered
+    """
+    if depth < 2:
+        return moves
+    keyed = []
+    for cell in moves:
+        board.make(cell, player)
+        keyed.append((-player * board.score_max, cell))
+        board.unmake(cell)
+    keyed.sort()
+    return [cell for _, cell in keyed]
+
+
+def mnk_min_value(board, depth, alpha, beta, deadline=None):
+    """
+    alpha-beta min_value on an MNKBoard, min_value is for human player(-1)
+    :param board: MNKBoard, restored on return
+    :param depth: searching depth from current state
+    :param alpha: best value the computer can already force
+    :param beta: best value the human can already force
+    :param deadline: time.perf_counter() value to stop at, None for no limit
+    :return: minimum value of available children states if it lies in (alpha, beta), otherwise a bound
+    """
+    if depth == 0 or board.empty == 0:
+        return board.score_min
+    if deadline is not None and time.perf_counter() > deadline:
+        raise SearchTimeout()
+
+    value = np.inf
+    for cell in _ordered(board, board.available_moves(), -1, depth):
+        board.make(cell, -1)
+        try:
+            value = min(value, mnk_max_value(board, depth - 1, alpha, min(beta, value), deadline))
+        finally:
+            board.unmake(cell)
+        if value <= alpha:
+            break
+    return value
+
+
+def mnk_max_value(board, depth, alpha, beta, deadline=None):
+    """
+    alpha-beta max_value on an MNKBoard, max_value is for computer(1)
+    :param board: MNKBoard, restored on return
+    :param depth: searching depth from current state
+    :param alpha: best value the computer can already force
+    :param beta: best value the human can already force
+    :param deadline: time.perf_counter() value to stop at, None for no limit
+    :return: maximum value of available children states if it lies in (alpha, beta), otherwise a bound
+    """
+    if depth == 0 or board.empty == 0:
+        return board.score_max
+    if deadline is not None and time.perf_counter() > deadline:
+        raise SearchTimeout()
+
+    value = -np.inf
+    for cell in _ordered(board, board.available_moves(), 1, depth):
+        board.make(cell, 1)
+        try:
+            value = max(value, mnk_min_value(board, depth - 1, max(alpha, value), beta, deadline))
+        finally:
+            board.unmake(cell)
+        if value >= beta:
+            break
+    return value
+
+
+def search_root(board, depth, first=None, deadline=None):
+    """
+    choose the computer's move at a fixed depth, the decision is identical to plain minimax: every move which may
+    tie with the best one is searched with a window which keeps the tie exact, and the first maximal move in
+    row-major order is returned
+    :param board: MNKBoard
+    :param depth: searching depth below the root moves
+    :param first: move to search first, e.g. the best move of the previous iteration
+    :param deadline: time.perf_counter() value to stop at, None for no limit
+    :return: flat cell index of the move
+    """
+    moves = board.available_moves()
+    if first in moves:
+        moves.remove(first)
+        moves.insert(0, first)
+
+    best_cell, best = None, -np.inf
+    for cell in moves:
+        # values are integers, a move before 'best_cell' in row-major order also wins a tie
+        alpha = best - 1 if best_cell is None or cell < best_cell else best
+        board.make(cell, 1)
+        try:
+            value = mnk_min_value(board, depth, alpha, np.inf, deadline)
+        finally:
+            board.unmake(cell)
+        if value > best or (value == best and cell < best_cell):
+            best_cell, best = cell, value
+    return best_cell
+
+
+def mnk_search(current_state, k=3, depth=3, time_limit=None):
+    """
+    choose the computer's move on an m,n,k board
+    :param current_state: current state of the game, a 2-d array, element lies in {1, -1, 0}
+    :param k: length of a winning line
+    :param depth: searching depth below the root moves, the maximum depth if 'time_limit' is set
+    :param time_limit: seconds for the move, None for no limit. Depth 0 always finishes, then the search deepens
+    two plies at a time from depth 1 or 2, so every iteration scores its leaves with the same flag as 'depth', and
+    returns the move of the deepest finished iteration
+    :return: row and column index of the move, None if the board is full
+    """
+    board = MNKBoard(current_state, k)
+    if board.empty == 0:
+        return None
+
+    if time_limit is None:
+        cell = search_root(board, depth)
+    else:
+        deadline = time.perf_counter() + time_limit
+        cell = search_root(board, 0)
+        for iteration in range(2 - depth % 2, min(depth, board.empty - 1) + 1, 2):
+            try:
+                cell = search_root(board, iteration, cell, deadline)
+            except SearchTimeout:
+                break
+    return cell // board.cols, cell % board.cols
@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File    : self_play.py
+
+# Headless self-play of tic tac toe engines.
+# Two engines play many games against each other in worker processes, GameJudge decides every game, and the
+# result is a JSON summary with the win/draw/loss rates of the first engine, its moves per second and the
+# per-move latency percentiles of both engines. For example
+#     python self_play.py minimax random --games 2000 --output summary.json
+# An engine is given as 'name' or 'name:depth', e.g. 'minimax', 'alphabeta:5', 'random', 'table'.
+# Every engine plays circle(1) from its own view: the engine playing cross(-1) gets the board with signs flipped.
+
+import argparse
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from tic_tac_toe import GameJudge, MinimaxSearch, SEARCH_MODES, get_available_actions
+
+
+ENGINES = ('random',) + SEARCH_MODES
+
+PERCENTILES = (50, 90, 99)
+
+
+def parse_engine(spec):
+    """
+    parse an engine spec
+    :param spec: 'name' or 'name:depth', name lies in ENGINES
+    :return: (name, depth)
+    """
+    name, _, depth = spec.partition(':')
+    if name not in ENGINES:
+        raise ValueError('Unknown engine: {}, expect one of {}'.format(name, ENGINES))
+    return name, int(depth) if depth else 3
+
+
+def engine_move(spec, current_state, rng):
+    """
+    ask an engine for its move
+    :param spec: (name, depth), see parse_engine()
+    :param current_state: 3x3 array from the engine's view, the engine plays circle(1)
+    :param rng: random.Random of the game
+    :return: row and column index of the move
+    """
+    name, depth = spec
+    if name == 'random':
+        return rng.choice(get_available_actions(current_state))
+    return MinimaxSearch(current_state, mode=name, depth=depth)
+
+
+def play_game(specs, first, seed, opening_plies=0):
+    """
+    play one game
+    :param specs: (engine of circle(1), engine of cross(-1)), see parse_engine()
+    :param first: player to move first, 1 or -1
+    :param seed: seed of the random engine and the opening
+    :param opening_plies: number of random moves played before the engines take over
+    :return: (status, number of engine moves, engine move latencies of circle, of cross), status is
+    GameJudge.check_game_status(): 1 circle wins, -1 cross wins, 0 draw
+    """
+    rng = random.Random(seed)
+    judge = GameJudge()
+    engines = {1: specs[0], -1: specs[1]}
+    latencies = {1: [], -1: []}
+    player, status, ply = first, 2, 0
+
+    while status == 2:
+        if ply < opening_plies:
+            row, col = rng.choice(get_available_actions(judge.get_game_state()))
+        else:
+            view = judge.get_game_state() * player
+            start = time.perf_counter()
+            row, col = engine_move(engines[player], view, rng)
+            latencies[player].append(time.perf_counter() - start)
+        judge.make_one_move(row, col, player)
+        status = judge.check_game_status()
+        player, ply = -player, ply + 1
+
+    return status, len(latencies[1]) + len(latencies[-1]), latencies[1], latencies[-1]
+
+
+def _play_chunk(args):
+    """
+    play a chunk of games in a worker
+    :param args: (specs, list of (first, seed), opening_plies)
+    :return: list of play_game() results
+    """
+    specs, games, opening_plies = args
+    return [play_game(specs, first, seed, opening_plies) for first, seed in games]
+
+
+def _percentiles(latencies):
+    """
+    latency percentiles in milliseconds
+    """
+    if not latencies:
+        return None
+    values = np.percentile(np.array(latencies) * 1000, PERCENTILES)
+    stats = {'p{}'.format(p): float(v) for p, v in zip(PERCENTILES, values)}
+    stats['mean'] = float(np.mean(latencies) * 1000)
+    stats['max'] = float(np.max(latencies) * 1000)
+    return stats
+
+
+def run_self_play(engine, opponent, games=1000, max_workers=None, chunksize=50, seed=0, opening_plies=0):
+    """
+    play 'engine' against 'opponent', each one moves first in half of the games
+    :param engine: engine spec of the evaluated engine, see parse_engine()
+    :param opponent: engine spec of the opponent
+    :param games: number of games
+    :param max_workers: number of worker processes, None - number of cores
+    :param chunksize: number of games sent to a worker at once
+    :param seed: seed of the games, game i uses seed + i
+    :param opening_plies: number of random moves played before the engines take over, to vary the games
+    :return: summary dict, rates and results are from the view of 'engine'
+    """
+    specs = (parse_engine(engine), parse_engine(opponent))
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+
+    schedule = [(1 if i % 2 == 0 else -1, seed + i) for i in range(games)]
+    chunks = [(specs, schedule[i:i + chunksize], opening_plies) for i in range(0, games, chunksize)]
+
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for chunk_results in executor.map(_play_chunk, chunks):
+            results.extend(chunk_results)
+    elapsed = time.perf_counter() - start
+
+    counts = {'win': 0, 'draw': 0, 'loss': 0}
+    engine_latencies, opponent_latencies = [], []
+    moves = 0
+    for status, game_moves, circle_latencies, cross_latencies in results:
+        counts['win' if status == 1 else 'loss' if status == -1 else 'draw'] += 1
+        moves += game_moves
+        engine_latencies.extend(circle_latencies)
+        opponent_latencies.extend(cross_latencies)
+
+    engine_time = sum(engine_latencies)
+    return {
+        'engine': engine,
+        'opponent': opponent,
+        'games': games,
+        'opening_plies': opening_plies,
+        'seed': seed,
+        'wins': counts['win'],
+        'draws': counts['draw'],
+        'losses': counts['loss'],
+        'win_rate': counts['win'] / games if games else None,
+        'draw_rate': counts['draw'] / games if games else None,
+        'loss_rate': counts['loss'] / games if games else None,
+        'moves': moves,
+        'engine_moves_per_second': len(engine_latencies) / engine_time if engine_time else None,
+        'engine_latency_ms': _percentiles(engine_latencies),
+        'opponent_latency_ms': _percentiles(opponent_latencies),
+        'games_per_second': games / elapsed if elapsed else None,
+        'elapsed': elapsed,
+        'workers': max_workers,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Play tic tac toe engines against each other')
+    parser.add_argument('engine', help="evaluated engine, 'name' or 'name:depth', name in {}".format(ENGINES))
+    parser.add_argument('opponent', help='opponent engine, same format')
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--chunksize', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--opening-plies', type=int, default=0)
+    parser.add_argument('--output', default=None, help='JSON file of the summary, printed if not given')
+    args = parser.parse_args()
+
+    summary = run_self_play(args.engine, args.opponent, args.games, args.workers, args.chunksize, args.seed,
+                            args.opening_plies)
+    text = json.dumps(summary, indent=2)
+    if args.output is None:
+        print(text)
+    else:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
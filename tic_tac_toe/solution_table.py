@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File    : solution_table.py
+
+# Precomputed solution of every reachable tic tac toe position.
+# The builder solves every position reachable from the empty board (with either player moving first) exactly,
+# and stores the game value and all optimal moves in a uint16 array indexed by [player to move, board code].
+# Build it once offline:
+#     python solution_table.py
+# and MinimaxSearch(current_state, mode='table') answers with one lookup in the memory-mapped table.
+
+import os
+
+import numpy as np
+
+from transposition_table import POWERS
+
+
+# Default path of the table file
+TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'solution_table.npy')
+
+# Entry layout: bits 0-8 optimal moves (bit 3 * row + col), bits 9-10 value + 1 from the computer's(1) view,
+# bit 15 set for reachable positions
+MOVES_MASK = 0x1ff
+VALUE_SHIFT = 9
+VALID_BIT = 1 << 15
+
+LINES = [(0, 1, 2), (3, 4, 5), (6, 7, 8), (0, 3, 6), (1, 4, 7), (2, 5, 8), (0, 4, 8), (2, 4, 6)]
+
+
+def player_index(player):
+    """
+    first index of the table for the player to move, 1(computer) or -1(you)
+    """
+    return 1 if player == 1 else 0
+
+
+def winner(cells):
+    """
+    winner of a flat board
+    :param cells: list of 9 cells in {1, -1, 0}
+    :return: 1 or -1 for a completed line, 0 otherwise
+    """
+    for a, b, c in LINES:
+        if cells[a] != 0 and cells[a] == cells[b] == cells[c]:
+            return cells[a]
+    return 0
+
+
+def build_solution_table():
+    """
+    solve every position reachable from the empty board
+    :return: uint16 array of shape (2, 3 ** 9), see the entry layout above
+    """
+    table = np.zeros((2, 3 ** 9), dtype=np.uint16)
+    powers = POWERS.tolist()
+
+    def solve(cells, code, player):
+        """
+        exact value of the position from the computer's(1) view, with 'player' to move
+        """
+        entry = table[player_index(player), code]
+        if entry & VALID_BIT:
+            return int((entry >> VALUE_SHIFT) & 3) - 1
+
+        value = winner(cells)
+        moves = 0
+        if value == 0 and 0 in cells:
+            children = []
+            for cell in range(9):
+                if cells[cell] == 0:
+                    cells[cell] = player
+                    children.append((cell, solve(cells, code + (player % 3) * powers[cell], -player)))
+                    cells[cell] = 0
+            value = max(v for _, v in children) if player == 1 else min(v for _, v in children)
+            for cell, child_value in children:
+                if child_value == value:
+                    moves |= 1 << cell
+
+        table[player_index(player), code] = VALID_BIT | ((value + 1) << VALUE_SHIFT) | moves
+        return value
+
+    for first_player in (-1, 1):
+        solve([0] * 9, 0, first_player)
+    return table
+
+
+def save_solution_table(path=TABLE_PATH):
+    """
+    build the table and save it as an .npy file
+    :param path: file path
+    :return: the table
+    """
+    table = build_solution_table()
+    tmp_path = '{}.{}.tmp.npy'.format(path[:-len('.npy')], os.getpid())
+    np.save(tmp_path, table)
+    os.replace(tmp_path, path)
+    return table
+
+
+def load_solution_table(path=TABLE_PATH):
+    """
+    memory-map a saved table
+    :param path: file path
+    :return: the table, None if the file does not exist
+    """
+    if not os.path.exists(path):
+        return None
+    return np.load(path, mmap_mode='r')
+
+
+def lookup_move(table, current_state, player=1):
+    """
+    optimal move of a position
+    :param table: solution table
+    :param current_state: current state of the game, it's a 3x3 array
+    :param player: player to move, 1(computer) or -1(you)
+    :return: (row, col) of the first optimal move in row-major order, None if the position is not in the table
+    or the game is over
+    """
+    code = int(np.dot(np.asarray(current_state).ravel() % 3, POWERS))
+    entry = int(table[player_index(player), code])
+    moves = entry & MOVES_MASK
+    if not entry & VALID_BIT or moves == 0:
+        return None
+    cell = (moves & -moves).bit_length() - 1
+    return cell // 3, cell % 3
+
+
+def lookup_value(table, current_state, player=1):
+    """
+    exact game value of a position from the computer's(1) view
+    :return: 1 computer wins, 0 draw, -1 you win, None if the position is not in the table
+    """
+    code = int(np.dot(np.asarray(current_state).ravel() % 3, POWERS))
+    entry = int(table[player_index(player), code])
+    if not entry & VALID_BIT:
+        return None
+    return ((entry >> VALUE_SHIFT) & 3) - 1
+
+
+if __name__ == '__main__':
+    solution = save_solution_table()
+    print('Solved {} positions, saved to {}'.format(int(np.count_nonzero(solution & VALID_BIT)), TABLE_PATH))
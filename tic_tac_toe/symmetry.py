@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File    : symmetry.py
+
+# Symmetries of the 3x3 board.
+# The board has 8 symmetries (4 rotations, each with or without a reflection). The utility and the minimax
+# value of a position do not change under them, so symmetric positions can share a transposition table entry,
+# and actions which are symmetric on a symmetric board lead to the same value and only one needs a search.
+
+import numpy as np
+
+from transposition_table import POWERS
+
+
+def _transforms():
+    """
+    flat index permutations of the 8 symmetries, transformed.ravel()[i] = board.ravel()[perm[i]]
+    """
+    index = np.arange(9).reshape(3, 3)
+    perms = []
+    for k in range(4):
+        rotated = np.rot90(index, k)
+        perms.append(rotated.ravel())
+        perms.append(np.fliplr(rotated).ravel())
+    return np.array(perms)
+
+
+# TRANSFORMS[0] is the identity
+TRANSFORMS = _transforms()
+
+
+def symmetry_codes(current_state):
+    """
+    board codes (see transposition_table.board_code) of the 8 symmetric boards
+    :param current_state: current state of the game, it's a 3x3 array
+    :return: array of 8 codes, in the order of TRANSFORMS
+    """
+    flat = np.asarray(current_state).ravel() % 3
+    return flat[TRANSFORMS].dot(POWERS)
+
+
+def canonical_code(current_state):
+    """
+    code of the minimal representative of the board under the 8 symmetries
+    :param current_state: current state of the game, it's a 3x3 array
+    :return: canonical board code
+    """
+    return int(symmetry_codes(current_state).min())
+
+
+def unique_actions(current_state):
+    """
+    available actions with symmetric duplicates removed. Two empty cells are duplicates if a symmetry of the
+    board maps one onto the other
+    :param current_state: current state of the game, it's a 3x3 array
+    :return: list of (action, orbit), 'action' is the first cell of its orbit in row-major order and 'orbit' is
+    the list of all actions equivalent to it, in row-major order
+    """
+    flat = np.asarray(current_state).ravel()
+    codes = symmetry_codes(current_state)
+    stabilizer = TRANSFORMS[codes == codes[0]]
+
+    result = []
+    for cell in range(9):
+        if flat[cell] != 0:
+            continue
+        orbit = sorted(set(int(c) for c in stabilizer[:, cell]))
+        if orbit[0] == cell:
+            result.append(((cell // 3, cell % 3), [(c // 3, c % 3) for c in orbit]))
+    return result
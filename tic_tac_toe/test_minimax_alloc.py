@@ -0,0 +1,56 @@
+"""
+The in-place plain minimax allocates nothing per searched node: make/unmake only update the MNKBoard, so the
+traced memory is the same before and after a search. Its peak only grows with the recursion depth (a few
+hundred bytes of frames and temporaries per level), never with the number of searched nodes.
+"""
+import os
+import sys
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mnk_board import MNKBoard
+from tic_tac_toe import board_minimax_search
+
+
+DEPTHS = (1, 3, 5, 7)
+
+# Allowed peak growth per extra level of recursion, in bytes
+PEAK_PER_LEVEL = 256
+
+
+def traced_search(board, depth):
+    """
+    Search once with tracemalloc running
+    :return: (net traced bytes, peak traced bytes above the start)
+    """
+    board_minimax_search(board, depth)  # Warm up the lazily built caches of the first search
+    tracemalloc.start()
+    try:
+        start, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        best = board_minimax_search(board, depth)
+        del best
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return current - start, peak - start
+
+
+def test_no_allocation_per_node():
+    state = np.zeros((3, 3), dtype=int)
+    state[1, 1] = -1
+    board = MNKBoard(state)
+
+    results = [traced_search(board, depth) for depth in DEPTHS]
+    for depth, (net, peak) in zip(DEPTHS, results):
+        assert net == 0, 'depth {}: {} bytes left allocated'.format(depth, net)
+
+    # Depth 7 searches thousands of times more nodes than depth 1, the peak may only grow per recursion level
+    peaks = [peak for _, peak in results]
+    for depth, peak in zip(DEPTHS, peaks):
+        assert peak <= peaks[0] + PEAK_PER_LEVEL * (depth - DEPTHS[0]), \
+            'peak traced memory grows with the searched nodes: {}'.format(peaks)
+    assert board.to_array().tolist() == state.tolist()
@@ -0,0 +1,70 @@
+"""
+Evaluation and search of m,n,k boards larger than tic tac toe.
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import tic_tac_toe
+from mnk_board import MNKBoard, mnk_search
+
+
+def gomoku(crosses, circles, size=7):
+    board = np.zeros((size, size), dtype=int)
+    for row, col in crosses:
+        board[row, col] = -1
+    for row, col in circles:
+        board[row, col] = 1
+    return board
+
+
+# Open three and open four of you(-1) in the middle row, the computer(1) holds two or three cells off the row
+OPEN_THREE = gomoku([(3, 2), (3, 3), (3, 4)], [(2, 2), (4, 4)])
+OPEN_FOUR = gomoku([(3, 1), (3, 2), (3, 3), (3, 4)], [(2, 2), (4, 4), (5, 5)])
+
+
+def test_utility_matches_board():
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        board = rng.choice([0, 0, 0, 1, -1], size=(7, 8))
+        mnk = MNKBoard(board, 5)
+        for flag in ('max', 'min'):
+            assert tic_tac_toe.utility(board, flag, 5) == mnk.utility(flag)
+
+
+def test_lines_short_of_a_threat_are_scored():
+    # A window with k - 2 marks of one player is scored for k > 3, a window holding both players' marks is not
+    open_two = gomoku([(3, 2), (3, 4)], [(2, 2), (4, 4)])
+    assert MNKBoard(OPEN_THREE, 5).utility('max') < MNKBoard(open_two, 5).utility('max')
+    blocked = gomoku([(3, 2), (3, 3), (3, 4)], [(3, 1), (3, 5)])
+    assert MNKBoard(blocked, 5).utility('max') > MNKBoard(OPEN_THREE, 5).utility('max')
+
+
+@pytest.mark.parametrize('depth', [1, 3])
+def test_search_blocks_open_three(depth):
+    assert mnk_search(OPEN_THREE, k=5, depth=depth) in [(3, 1), (3, 5)]
+
+
+def test_search_blocks_open_four():
+    assert mnk_search(OPEN_FOUR, k=5, depth=1) in [(3, 0), (3, 5)]
+
+
+def test_search_blocks_open_two():
+    # A four is two moves of yours away, beyond depth 1, without graded scores the corner scored as high as any move
+    board = gomoku([(4, 3), (4, 4)], [(3, 3)], size=9)
+    assert mnk_search(board, k=5, depth=1) in [(4, 2), (4, 5)]
+
+
+def test_time_limited_search_blocks_open_three():
+    assert mnk_search(OPEN_THREE, k=5, depth=3, time_limit=10.0) in [(3, 1), (3, 5)]
+
+
+def test_time_limited_search_plays_near_the_stones():
+    # Only depth 1 finishes on 15x15 in the budget, the leaves of depths 0 and 2 are scored with flag 'min'
+    board = gomoku([(7, 7)], [(7, 8)], size=15)
+    row, col = mnk_search(board, k=5, depth=3, time_limit=1.0)
+    assert abs(row - 7) <= 1 and 6 <= col <= 9
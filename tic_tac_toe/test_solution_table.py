@@ -0,0 +1,59 @@
+"""
+Lookups of the solution table and the 'table' mode of MinimaxSearch.
+"""
+import os
+import sys
+import warnings
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import tic_tac_toe
+from solution_table import build_solution_table, lookup_move, lookup_value
+
+
+@pytest.fixture(scope='module')
+def solution():
+    return build_solution_table()
+
+
+def test_lookup_value(solution):
+    assert lookup_value(solution, np.zeros((3, 3), dtype=int)) == 0
+    # The computer(1) completes the top row, you(-1) would complete the middle row
+    board = np.array([[1, 1, 0], [-1, -1, 0], [0, 0, 0]])
+    assert lookup_value(solution, board, 1) == 1
+    assert lookup_value(solution, board, -1) == -1
+
+
+def test_lookup_move(solution):
+    board = np.array([[1, 1, 0], [-1, -1, 0], [0, 0, 0]])
+    assert lookup_move(solution, board, 1) == (0, 2)
+    # Every optimal move keeps the value, the first one in row-major order is returned
+    row, col = lookup_move(solution, board, -1)
+    after = board.copy()
+    after[row, col] = -1
+    assert lookup_value(solution, after, 1) == -1
+    # A finished game has no move
+    assert lookup_move(solution, np.array([[1, 1, 1], [-1, -1, 0], [0, 0, 0]]), -1) is None
+
+
+def test_table_mode_retries_missing_table(solution, monkeypatch):
+    available = []
+    monkeypatch.setattr(tic_tac_toe, 'load_solution_table', lambda: available[0] if available else None)
+    monkeypatch.setattr(tic_tac_toe, '_solution_table', [])
+    monkeypatch.setattr(tic_tac_toe, '_table_warned', [])
+    board = np.array([[1, 0, 0], [-1, -1, 0], [0, 0, 0]])
+
+    # Missing table: minimax fallback, reported once
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        tic_tac_toe.MinimaxSearch(board, table=None, mode='table')
+        tic_tac_toe.MinimaxSearch(board, table=None, mode='table')
+    assert len([w for w in caught if issubclass(w.category, RuntimeWarning)]) == 1
+
+    # A table built later is picked up
+    available.append(solution)
+    assert tic_tac_toe.MinimaxSearch(board, table=None, mode='table') == lookup_move(solution, board, 1)
+    assert tic_tac_toe._solution_table == [solution]
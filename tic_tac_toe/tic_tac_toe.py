@@ -7,40 +7,127 @@
 
 # +++++++++++++++++++++++++++++++++++++++++++++ README ++++++++++++++++++++++++++++++++++++++++
 # You will write a tic tac toc player and play game with this computer player.
-# You will use MiniMaxSearch with depth limited strategy. For simplicity, Alpha-Beta Pruning
-# is not considered.
+# You will use MiniMaxSearch with depth limited strategy. Plain minimax is the default, Alpha-Beta
+# Pruning (and its negamax form) can be selected with the 'mode' argument and gives the same moves.
 # Let's make some assumptions.
 # 1. The computer player(1) use circle(1) and you(-1) use cross(-1).
 # 2. The computer player is MAX user and you are MIN user.
 # 3. The miniMaxSearch depth is 3, so that the computer predict one step further. It first
 # predicts what you will do if it makes a move and choose a move that maximize its gain.
 # 4. You play first
+# Larger m,n,k boards (k in a row on an m x n board) are searched by mnk_board.py, with an optional time budget.
 # +++++++++++++++++++++++++++++++++++++++++++++ README ++++++++++++++++++++++++++++++++++++++++
 
+import warnings
+
 import numpy as np
 
+from bitboard import bitboard_search, game_status, to_bitboard
+from mnk_board import MNKBoard, board_windows, mnk_search, window_marks, window_scores
+from solution_table import TABLE_PATH, load_solution_table, lookup_move
+from symmetry import canonical_code, unique_actions
+from transposition_table import TranspositionTable, EXACT, LOWER, UPPER, board_code, position_key
+
+
+# Searched positions shared by all MinimaxSearch calls, within a game and across games
+TRANSPOSITION_TABLE = TranspositionTable()
+
+# Search engines of MinimaxSearch
+SEARCH_MODES = ('minimax', 'alphabeta', 'negamax', 'table')
+
+# Board representations of MinimaxSearch and GameJudge, see bitboard.py
+BACKENDS = ('numpy', 'bitboard')
+
+# Memory-mapped solution table, loaded on first use and retried while the file is missing, see solution_table.py
+_solution_table = []
+
+# Set once the missing table has been reported
+_table_warned = []
 
-def MinimaxSearch(current_state):
+# Static move order: center, corners, edges
+STATIC_ORDER = [(1, 1), (0, 0), (0, 2), (2, 0), (2, 2), (0, 1), (1, 0), (1, 2), (2, 1)]
+
+
+def MinimaxSearch(current_state, table=TRANSPOSITION_TABLE, mode='minimax', symmetry=False, backend='numpy',
+                  depth=3, k=3, time_limit=None, incremental=True):
     """
     Search the next step by Minimax Search with depth limited strategy
-    The search depth is limited to 3, computer player(1) uses circle(1) and you(-1) use cross(-1)
+    The search depth is 3 by default, computer player(1) uses circle(1) and you(-1) use cross(-1)
     :param current_state: current state of the game, it's a 3x3 array representing the chess board, array element lies
-    in {1, -1, 0}, standing for circle, cross, empty place.
+    in {1, -1, 0}, standing for circle, cross, empty place. Other m x n boards are searched by mnk_search()
+    :param table: transposition table reused across calls, None to search without it
+    :param mode: search engine, 'minimax' - plain minimax, 'alphabeta' - alpha-beta pruning with move ordering,
+    'negamax' - negamax form of alpha-beta. These modes choose the same action. 'table' - perfect play looked up
+    in the precomputed solution table, falls back to 'minimax' if the table file has not been built
+    :param symmetry: True - search only one of the actions which are symmetric on a symmetric board, and share
+    transposition table entries between symmetric positions. The chosen action does not change
+    :param backend: 'numpy' - search on 3x3 arrays, 'bitboard' - search on two 9-bit masks (plain minimax only,
+    without symmetry). The chosen action does not change
+    :param depth: searching depth below the computer's move
+    :param k: length of a winning line
+    :param time_limit: seconds for the move, None for no limit. With a limit, or on boards other than 3x3 with k = 3,
+    the move is chosen by mnk_search() with iterative deepening up to 'depth', and the 'table', 'mode', 'symmetry'
+    and 'backend' options are not used
+    :param incremental: True - score the leaves of the numpy search with an MNKBoard updated move by move instead of
+    rescanning the board with utility(). Plain minimax without symmetry then searches on the MNKBoard alone, moves
+    are made and taken back in place without copying boards. The chosen action does not change
     :return: row and column index that computer player will draw a circle on. Note 0<=row<=2, 0<=col<=2
     """
     # -------------------------------- Your code starts here ----------------------------- #
     assert isinstance(current_state, np.ndarray)
-    assert current_state.shape == (3, 3)
+    assert current_state.ndim == 2
+    assert mode in SEARCH_MODES, 'mode should be one of {}'.format(SEARCH_MODES)
+    assert backend in BACKENDS, 'backend should be one of {}'.format(BACKENDS)
+
+    if current_state.shape != (3, 3) or k != 3 or time_limit is not None:
+        return mnk_search(current_state, k, depth, time_limit)
 
     # get available actions
     game_state = current_state.copy()
     actions = get_available_actions(game_state)
 
+    if mode == 'table':
+        if not _solution_table:
+            solution = load_solution_table()
+            if solution is not None:
+                _solution_table.append(solution)
+        if _solution_table:
+            move = lookup_move(_solution_table[0], game_state, 1)
+            if move is not None:
+                return move
+        elif not _table_warned:
+            _table_warned.append(True)
+            warnings.warn("no solution table at {}, mode 'table' falls back to minimax, build it with "
+                          "'python solution_table.py'".format(TABLE_PATH), RuntimeWarning)
+        mode = 'minimax'
+
+    if backend == 'bitboard':
+        assert mode == 'minimax' and not symmetry, "the bitboard backend only runs plain minimax"
+        circle, cross = to_bitboard(game_state)
+        return bitboard_search(circle, cross, depth, table)
+
+    # symmetric actions share the value of the first one of their orbit
+    if symmetry:
+        orbits = unique_actions(game_state)
+    else:
+        orbits = [(action, [action]) for action in actions]
+
+    evaluator = MNKBoard(game_state) if incremental else None
+    if mode != 'minimax':
+        return alphabeta_search(game_state, actions, orbits, depth, table, mode, symmetry, evaluator)
+
+    if evaluator is not None and not symmetry:
+        return board_minimax_search(evaluator, depth, table)
+
     # computer player: traverse all the possible actions and maximize the utility function
-    values = []
-    depth = 3
-    for action in actions:
-        values.append(min_value(action_result(game_state.copy(), action, 1), depth))
+    action_values = {}
+    for action, orbit in orbits:
+        make_move(evaluator, action, 1)
+        value = min_value(action_result(game_state.copy(), action, 1), depth, table, symmetry, evaluator)
+        unmake_move(evaluator, action)
+        for each in orbit:
+            action_values[each] = value
+    values = [action_values[action] for action in actions]
     max_ind = int(np.argmax(values))
     row, col = actions[max_ind][0], actions[max_ind][1]
 
@@ -50,11 +137,11 @@ def MinimaxSearch(current_state):
 def get_available_actions(current_state):
     """
     get all the available actions given current state
-    :param current_state:current state of the game, it's a 3x3 array
+    :param current_state:current state of the game, it's a 2-d array
     :return: available actions. list of tuple [(r0, c0), (r1, c1), (r2, c2)]
     """
     assert isinstance(current_state, np.ndarray), 'current_state should be numpy ndarray'
-    assert current_state.shape == (3, 3), 'current_state: expect 3x3 array, get {}'.format(current_state.shape)
+    assert current_state.ndim == 2, 'current_state: expect 2-d array, get {}'.format(current_state.shape)
 
     action_list = []
     for i in range(current_state.shape[0]):
@@ -68,13 +155,13 @@ def get_available_actions(current_state):
 def action_result(current_state, action, player):
     """
     update the game state given the input action and player
-    :param current_state: current state of the game, it's a 3x3 array
+    :param current_state: current state of the game, it's a 2-d array
     :param action: current action, tuple type
     :param player: who makes the decision in current state
     :return: next state
     """
     assert isinstance(current_state, np.ndarray), 'current_state should be numpy ndarray'
-    assert current_state.shape == (3, 3), 'current_state: expect 3x3 array, get {}'.format(current_state.shape)
+    assert current_state.ndim == 2, 'current_state: expect 2-d array, get {}'.format(current_state.shape)
     assert player in [1, -1], 'player should be either 1(computer) or -1(you)'
 
     if player == 1:
@@ -87,116 +174,503 @@ def action_result(current_state, action, player):
         print('Wrong input of parameter "player"!')
 
 
-def min_value(current_state, depth):
+def search_actions(current_state, symmetry=False):
+    """
+    actions to search in current state
+    :param current_state: current state of the game, it's a 3x3 array
+    :param symmetry: True - keep only the first action of every group of symmetric actions
+    :return: list of actions
+    """
+    if symmetry:
+        return [action for action, _ in unique_actions(current_state)]
+    return get_available_actions(current_state)
+
+
+def state_key(current_state, player, symmetry=False):
+    """
+    transposition table key of a position
+    :param current_state: current state of the game, it's a 3x3 array
+    :param player: player to move
+    :param symmetry: True - symmetric positions share the key of their canonical board
+    :return: key
+    """
+    code = canonical_code(current_state) if symmetry else board_code(current_state)
+    return position_key(code, player)
+
+
+def leaf_value(current_state, flag, evaluator=None):
+    """
+    utility of a leaf
+    :param current_state: current state of the game, it's a 3x3 array
+    :param flag: 'max' or 'min'
+    :param evaluator: MNKBoard following the search, None to call utility()
+    :return: evaluation of this state
+    """
+    if evaluator is None:
+        return utility(current_state, flag)
+    return evaluator.utility(flag)
+
+
+def make_move(evaluator, action, player):
+    """
+    play an action on the evaluator of the search, nothing to do without one
+    """
+    if evaluator is not None:
+        evaluator.make(action[0] * evaluator.cols + action[1], player)
+
+
+def unmake_move(evaluator, action):
+    """
+    take back an action played by make_move()
+    """
+    if evaluator is not None:
+        evaluator.unmake(action[0] * evaluator.cols + action[1])
+
+
+def min_value(current_state, depth, table=None, symmetry=False, evaluator=None):
     """
     recursively call min_value and max_value, min_value is for human player(-1)
     :param current_state: current state of the game, it's a 3x3 array
     :param depth: searching depth from current state
+    :param table: transposition table, None to search without it
+    :param symmetry: True - skip actions symmetric to an already searched one, see symmetry.py
+    :param evaluator: MNKBoard following the search to score the leaves, None to call utility()
     :return: minimum value of available children states
     """
     if depth == 0:
-        return utility(current_state, 'min')
+        return leaf_value(current_state, 'min', evaluator)
     else:
+        if table is not None:
+            key = state_key(current_state, -1, symmetry)
+            entry = table.get(key)
+            if entry is not None and entry.depth == depth and entry.bound == EXACT:
+                return entry.value
+
         game_state = current_state.copy()
-        action_list = get_available_actions(game_state)
+        action_list = search_actions(game_state, symmetry)
         values = []
 
         if action_list == []:
-            return utility(current_state, 'min')
+            return leaf_value(current_state, 'min', evaluator)
         for action in action_list:
-            values.append(max_value(action_result(game_state.copy(), action, -1), depth-1))
+            make_move(evaluator, action, -1)
+            values.append(max_value(action_result(game_state.copy(), action, -1), depth-1, table, symmetry, evaluator))
+            unmake_move(evaluator, action)
 
         min_id = int(np.argmin(values))
+        if table is not None:
+            table.put(key, values[min_id], depth, EXACT)
         return values[min_id]
     
 
 
-def max_value(current_state, depth):
+def max_value(current_state, depth, table=None, symmetry=False, evaluator=None):
     """
     recursively call min_value and max_value, max_value is for computer(1)
     :param current_state: current state of the game, it's a 3x3 array
     :param depth: searching depth from current state
+    :param table: transposition table, None to search without it
+    :param symmetry: True - skip actions symmetric to an already searched one, see symmetry.py
+    :param evaluator: MNKBoard following the search to score the leaves, None to call utility()
     :return: maximum value of available children states
     """
     if depth == 0:
-        return utility(current_state, 'max')
+        return leaf_value(current_state, 'max', evaluator)
     else:
+        if table is not None:
+            key = state_key(current_state, 1, symmetry)
+            entry = table.get(key)
+            if entry is not None and entry.depth == depth and entry.bound == EXACT:
+                return entry.value
+
         game_state = current_state.copy()
-        action_list = get_available_actions(game_state)
+        action_list = search_actions(game_state, symmetry)
         values = []
 
         if action_list == []:
-            return utility(current_state, 'max')
+            return leaf_value(current_state, 'max', evaluator)
         for action in action_list:
-            values.append(min_value(action_result(game_state.copy(), action, 1), depth-1))
+            make_move(evaluator, action, 1)
+            values.append(min_value(action_result(game_state.copy(), action, 1), depth-1, table, symmetry, evaluator))
+            unmake_move(evaluator, action)
 
         max_id = int(np.argmax(values))
+        if table is not None:
+            table.put(key, values[max_id], depth, EXACT)
         return values[max_id]
 
 
-def utility(current_state, flag):
+def board_minimax_search(board, depth, table=None):
     """
-    return utility function given current state and flag
+    plain minimax on one MNKBoard, every move is made and taken back in place so no board is copied
+    :param board: MNKBoard of the current state, restored on return. It is a copy of the caller's array
+    :param depth: searching depth below the root actions
+    :param table: transposition table, None to search without it
+    :return: row and column index of the first maximal action in row-major order
+    """
+    cells = board.cells
+    best_cell, best = None, None
+    for cell in range(len(cells)):
+        if cells[cell] == 0:
+            board.make(cell, 1)
+            value = board_min_value(board, depth, table)
+            board.unmake(cell)
+            if best is None or value > best:
+                best_cell, best = cell, value
+    return best_cell // board.cols, best_cell % board.cols
+
+
+def board_min_value(board, depth, table=None):
+    """
+    min_value on an MNKBoard with moves made and taken back in place, min_value is for human player(-1)
+    :param board: MNKBoard of the current state, restored on return
+    :param depth: searching depth from current state
+    :param table: transposition table, None to search without it
+    :return: minimum value of available children states
+    """
+    if depth == 0 or board.empty == 0:
+        return board.score_min
+
+    if table is not None:
+        key = position_key(board.code, -1)
+        entry = table.get(key)
+        if entry is not None and entry.depth == depth and entry.bound == EXACT:
+            return entry.value
+
+    cells = board.cells
+    value = None
+    for cell in range(len(cells)):
+        if cells[cell] == 0:
+            board.make(cell, -1)
+            child_value = board_max_value(board, depth-1, table)
+            board.unmake(cell)
+            if value is None or child_value < value:
+                value = child_value
+
+    if table is not None:
+        table.put(key, value, depth, EXACT)
+    return value
+
+
+def board_max_value(board, depth, table=None):
+    """
+    max_value on an MNKBoard with moves made and taken back in place, max_value is for computer(1)
+    :param board: MNKBoard of the current state, restored on return
+    :param depth: searching depth from current state
+    :param table: transposition table, None to search without it
+    :return: maximum value of available children states
+    """
+    if depth == 0 or board.empty == 0:
+        return board.score_max
+
+    if table is not None:
+        key = position_key(board.code, 1)
+        entry = table.get(key)
+        if entry is not None and entry.depth == depth and entry.bound == EXACT:
+            return entry.value
+
+    cells = board.cells
+    value = None
+    for cell in range(len(cells)):
+        if cells[cell] == 0:
+            board.make(cell, 1)
+            child_value = board_min_value(board, depth-1, table)
+            board.unmake(cell)
+            if value is None or child_value > value:
+                value = child_value
+
+    if table is not None:
+        table.put(key, value, depth, EXACT)
+    return value
+
+
+class MoveOrdering(object):
+    """
+    Move ordering of the alpha-beta search: killer moves first, then by history score, then by the static order
+    (center, corners, edges)
+    Attr:
+        killers: killers[depth] holds the last two moves which caused a cutoff at this remaining depth
+        history: history[row][col] accumulates depth * depth for every cutoff caused by the move
+    """
+    def __init__(self):
+        self.killers = {}
+        self.history = [[0] * 3 for _ in range(3)]
+        self.static_rank = {action: rank for rank, action in enumerate(STATIC_ORDER)}
+
+    def order(self, actions, depth):
+        """
+        sort actions, best candidates first
+        :param actions: available actions
+        :param depth: remaining search depth
+        :return: sorted list of actions
+        """
+        killers = self.killers.get(depth, ())
+        return sorted(actions, key=lambda action: (action not in killers, -self.history[action[0]][action[1]],
+                                                   self.static_rank[action]))
+
+    def record_cutoff(self, action, depth):
+        """
+        remember a move which caused a cutoff
+        :param action: the move
+        :param depth: remaining search depth
+        :return:
+        """
+        killers = self.killers.setdefault(depth, [])
+        if action not in killers:
+            killers.insert(0, action)
+            del killers[2:]
+        self.history[action[0]][action[1]] += depth * depth
+
+
+def alphabeta_search(game_state, actions, orbits, depth, table, mode, symmetry=False, evaluator=None):
+    """
+    choose the computer's action with alpha-beta pruning, the decision is identical to plain minimax:
+    every action which may tie with the best one is searched with a window just below the best value, so its
+    value is exact, and the first maximal action in row-major order is returned
+    :param game_state: current state of the game, it's a 3x3 array
+    :param actions: available actions in row-major order
+    :param orbits: list of (action to search, actions sharing its value)
+    :param depth: searching depth below the root actions
+    :param table: transposition table, None to search without it
+    :param mode: 'alphabeta' or 'negamax'
+    :param symmetry: True - skip actions symmetric to an already searched one, see symmetry.py
+    :param evaluator: MNKBoard following the search to score the leaves, None to call utility()
+    :return: row and column index of the action
+    """
+    ordering = MoveOrdering()
+    orbit_of = dict(orbits)
+    values = {}
+    best = -np.inf
+    for action in ordering.order(list(orbit_of), depth + 1):
+        child = action_result(game_state.copy(), action, 1)
+        alpha = best - 1  # values are integers, a tie with 'best' is still inside the window
+        make_move(evaluator, action, 1)
+        if mode == 'negamax':
+            value = -negamax_value(child, depth, -np.inf, -alpha, -1, table, ordering, symmetry, evaluator)
+        else:
+            value = alphabeta_min_value(child, depth, alpha, np.inf, table, ordering, symmetry, evaluator)
+        unmake_move(evaluator, action)
+        if value > alpha:
+            for each in orbit_of[action]:
+                values[each] = value
+            best = max(best, value)
+
+    for action in actions:
+        if values.get(action) == best:
+            return action[0], action[1]
+
+
+def probe_table(table, key, depth, alpha, beta):
+    """
+    look up a position for the alpha-beta search
+    :return: stored value if it decides the node inside the window (alpha, beta), None otherwise
+    """
+    entry = table.get(key)
+    if entry is None or entry.depth != depth:
+        return None
+    if entry.bound == EXACT:
+        return entry.value
+    if entry.bound == LOWER and entry.value >= beta:
+        return entry.value
+    if entry.bound == UPPER and entry.value <= alpha:
+        return entry.value
+    return None
+
+
+def store_table(table, key, value, depth, alpha, beta):
+    """
+    store the result of a fail-soft alpha-beta search in the window (alpha, beta)
+    """
+    if value <= alpha:
+        table.put(key, value, depth, UPPER)
+    elif value >= beta:
+        table.put(key, value, depth, LOWER)
+    else:
+        table.put(key, value, depth, EXACT)
+
+
+def alphabeta_min_value(current_state, depth, alpha, beta, table=None, ordering=None, symmetry=False,
+                        evaluator=None):
+    """
+    min_value with alpha-beta pruning, min_value is for human player(-1)
     :param current_state: current state of the game, it's a 3x3 array
+    :param depth: searching depth from current state
+    :param alpha: best value the computer can already force
+    :param beta: best value the human can already force
+    :param table: transposition table, None to search without it
+    :param ordering: MoveOrdering of this search
+    :param symmetry: True - skip actions symmetric to an already searched one, see symmetry.py
+    :param evaluator: MNKBoard following the search to score the leaves, None to call utility()
+    :return: minimum value of available children states if it lies in (alpha, beta), otherwise a bound
+    """
+    if depth == 0:
+        return leaf_value(current_state, 'min', evaluator)
+
+    action_list = search_actions(current_state, symmetry)
+    if action_list == []:
+        return leaf_value(current_state, 'min', evaluator)
+
+    if table is not None:
+        key = state_key(current_state, -1, symmetry)
+        value = probe_table(table, key, depth, alpha, beta)
+        if value is not None:
+            return value
+
+    ordering = ordering if ordering is not None else MoveOrdering()
+    value = np.inf
+    window = beta
+    for action in ordering.order(action_list, depth):
+        child = action_result(current_state.copy(), action, -1)
+        make_move(evaluator, action, -1)
+        value = min(value, alphabeta_max_value(child, depth-1, alpha, window, table, ordering, symmetry,
+                                               evaluator))
+        unmake_move(evaluator, action)
+        if value <= alpha:
+            ordering.record_cutoff(action, depth)
+            break
+        window = min(window, value)
+
+    if table is not None:
+        store_table(table, key, value, depth, alpha, beta)
+    return value
+
+
+def alphabeta_max_value(current_state, depth, alpha, beta, table=None, ordering=None, symmetry=False,
+                        evaluator=None):
+    """
+    max_value with alpha-beta pruning, max_value is for computer(1)
+    :param current_state: current state of the game, it's a 3x3 array
+    :param depth: searching depth from current state
+    :param alpha: best value the computer can already force
+    :param beta: best value the human can already force
+    :param table: transposition table, None to search without it
+    :param ordering: MoveOrdering of this search
+    :param symmetry: True - skip actions symmetric to an already searched one, see symmetry.py
+    :param evaluator: MNKBoard following the search to score the leaves, None to call utility()
+    :return: maximum value of available children states if it lies in (alpha, beta), otherwise a bound
+    """
+    if depth == 0:
+        return leaf_value(current_state, 'max', evaluator)
+
+    action_list = search_actions(current_state, symmetry)
+    if action_list == []:
+        return leaf_value(current_state, 'max', evaluator)
+
+    if table is not None:
+        key = state_key(current_state, 1, symmetry)
+        value = probe_table(table, key, depth, alpha, beta)
+        if value is not None:
+            return value
+
+    ordering = ordering if ordering is not None else MoveOrdering()
+    value = -np.inf
+    window = alpha
+    for action in ordering.order(action_list, depth):
+        child = action_result(current_state.copy(), action, 1)
+        make_move(evaluator, action, 1)
+        value = max(value, alphabeta_min_value(child, depth-1, window, beta, table, ordering, symmetry,
+                                               evaluator))
+        unmake_move(evaluator, action)
+        if value >= beta:
+            ordering.record_cutoff(action, depth)
+            break
+        window = max(window, value)
+
+    if table is not None:
+        store_table(table, key, value, depth, alpha, beta)
+    return value
+
+
+def negamax_value(current_state, depth, alpha, beta, player, table=None, ordering=None, symmetry=False,
+                  evaluator=None):
+    """
+    negamax form of the alpha-beta search, the value is seen from the player to move
+    :param current_state: current state of the game, it's a 3x3 array
+    :param depth: searching depth from current state
+    :param alpha: lower end of the search window, from the view of 'player'
+    :param beta: upper end of the search window, from the view of 'player'
+    :param player: player to move, 1(computer) or -1(you)
+    :param table: transposition table, None to search without it. Values are stored from the computer's view,
+    so the table is shared with the other modes
+    :param ordering: MoveOrdering of this search
+    :param symmetry: True - skip actions symmetric to an already searched one, see symmetry.py
+    :param evaluator: MNKBoard following the search to score the leaves, None to call utility()
+    :return: player * minimax value if it lies in (alpha, beta), otherwise a bound
+    """
+    flag = 'max' if player == 1 else 'min'
+    if depth == 0:
+        return player * leaf_value(current_state, flag, evaluator)
+
+    action_list = search_actions(current_state, symmetry)
+    if action_list == []:
+        return player * leaf_value(current_state, flag, evaluator)
+
+    if table is not None:
+        key = state_key(current_state, player, symmetry)
+        if player == 1:
+            value = probe_table(table, key, depth, alpha, beta)
+        else:
+            value = probe_table(table, key, depth, -beta, -alpha)
+        if value is not None:
+            return player * value
+
+    ordering = ordering if ordering is not None else MoveOrdering()
+    value = -np.inf
+    window = alpha
+    for action in ordering.order(action_list, depth):
+        child = action_result(current_state.copy(), action, player)
+        make_move(evaluator, action, player)
+        value = max(value, -negamax_value(child, depth-1, -beta, -window, -player, table, ordering,
+                                            symmetry, evaluator))
+        unmake_move(evaluator, action)
+        if value >= beta:
+            ordering.record_cutoff(action, depth)
+            break
+        window = max(window, value)
+
+    if table is not None:
+        if player == 1:
+            store_table(table, key, value, depth, alpha, beta)
+        else:
+            store_table(table, key, -value, depth, -beta, -alpha)
+    return value
+
+
+def utility(current_state, flag, k=3):
+    """
+    return utility function given current state and flag
+    :param current_state: current state of the game, it's a 2-d array
     :param flag:
+    :param k: length of a winning line, every window of k cells in a row, column or diagonal is scored by
+    mnk_board.window_scores()
     :return: evaluation of this state
     """
     # Initialization
     score = 0
-    num = 0
     rows = current_state.shape[0]
     cols = current_state.shape[1]
-
-    def getScore(num, flag):
-        score = 0
-
-        if flag == 'max':
-            if num == 2:
-                score += 300
-            elif num == -2:
-                score -= 500
-            elif num == 3:
-                score += 1000
-            elif num == -3:
-                score -= 2000
-        else:
-            if num == 2:
-                score -= 500
-            elif num == -2:
-                score += 300
-            elif num == 3:
-                score -= 2000
-            elif num == -3:
-                score += 1000
-
-        return score
-
-    # Rows
-    for i in range(rows):
-        num = current_state[i][0] + current_state[i][1] + current_state[i][2]
-        score += getScore(num, flag)
-
-    # Columns
-    for i in range(cols):
-        num = current_state[0][i] + current_state[1][i] + current_state[2][i]
-        score += getScore(num, flag)
-
-    # Diagonal
-    num = 0
-    temp = 0
-    for i in range(rows):
-        num += current_state[i][i]
-        temp += current_state[i][2-i]
-    score += getScore(num, flag)
-    score += getScore(temp, flag)
+    flat = current_state.ravel().tolist()
+    scores = window_scores(k)[flag]
+
+    # Rows, columns, diagonals and anti-diagonals
+    for window in board_windows(rows, cols, k):
+        circles = crosses = 0
+        for cell in window:
+            if flat[cell] == 1:
+                circles += 1
+            elif flat[cell] == -1:
+                crosses += 1
+        score += scores[window_marks(circles, crosses, k)]
 
     return score
 
 
 # Do not modify the following code
 class GameJudge(object):
-    def __init__(self):
+    def __init__(self, backend='numpy'):
+        assert backend in BACKENDS, 'backend should be one of {}'.format(BACKENDS)
         self.game_state = np.zeros(shape=(3, 3), dtype=int)
+        self.backend = backend
 
     def make_one_move(self, row, col, player):
         """
@@ -217,6 +691,8 @@ class GameJudge(object):
         return game status
         :return: 1 for computer wins, -1 for human wins, 0 for draw, 2 in the play
         """
+        if self.backend == 'bitboard':
+            return game_status(*to_bitboard(self.game_state))
 
         # somebody wins
         sum_rows = np.sum(self.game_state, axis=1).tolist()
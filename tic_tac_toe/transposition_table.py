@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# @File    : transposition_table.py
+
+# Transposition table for the tic tac toe search.
+# Positions are keyed by a base-3 board code and the player to move, so a value computed once is reused
+# by every move order reaching the same position, by later moves of the same game and by later games.
+
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+
+# Bound type of a stored value
+EXACT = 0   # The value is the minimax value
+LOWER = 1   # The minimax value is at least the value (fail high)
+UPPER = 2   # The minimax value is at most the value (fail low)
+
+TTEntry = namedtuple('TTEntry', ['value', 'depth', 'bound'])
+
+# Base-3 digit weight of every board cell in row-major order
+POWERS = 3 ** np.arange(9)
+
+
+def board_code(current_state):
+    """
+    encode the board as a base-3 integer, empty = 0, circle(1) = 1, cross(-1) = 2
+    :param current_state: current state of the game, it's a 3x3 array
+    :return: board code in [0, 3 ** 9)
+    """
+    return int(np.dot(np.asarray(current_state).ravel() % 3, POWERS))
+
+
+def position_key(code, player):
+    """
+    key of a position: board code and the player to move
+    :param code: board code, see board_code()
+    :param player: player to move, 1(computer) or -1(you)
+    :return: key
+    """
+    return code * 2 + (player == 1)
+
+
+class TranspositionTable(object):
+    """
+    Size-bounded table of searched positions, the least recently used entry is evicted first
+    Attr:
+        max_entries: maximum number of stored positions
+        hits: number of successful lookups
+        misses: number of failed lookups
+    """
+    def __init__(self, max_entries=1 << 16):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """
+        look up a position
+        :param key: position key, see position_key()
+        :return: TTEntry, None if the position is not stored
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, value, depth, bound=EXACT):
+        """
+        store a position, an exact value is never replaced by a bound of the same depth
+        :param key: position key, see position_key()
+        :param value: searched value
+        :param depth: remaining search depth of the value
+        :param bound: EXACT, LOWER or UPPER
+        :return:
+        """
+        old = self.entries.get(key)
+        if old is not None and old.depth == depth and old.bound == EXACT and bound != EXACT:
+            return
+        self.entries[key] = TTEntry(value, depth, bound)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0